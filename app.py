@@ -1,17 +1,32 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, Response, g, has_request_context, render_template, request, jsonify
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import os
 import logging
 from dotenv import load_dotenv
-import google.generativeai as genai
-import requests
 import json
+import re
+import base64
+import bisect
+import sqlite3
+import hashlib
 import time
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import threading
+import zipfile
+import uuid
+import contextvars
+import multiprocessing
+import fcntl
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from typing import Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
 from random import choice, shuffle
-from datetime import datetime, timedelta
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
 
 load_dotenv()
 
@@ -35,109 +50,761 @@ if not os.path.exists(DEFAULT_LOGO_PATH):
     default_logo = Image.new('RGBA', (40, 40), (0, 0, 0, 0))
     default_logo.save(DEFAULT_LOGO_PATH)
 
-# Configure Gemini AI
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-model = genai.GenerativeModel('gemini-pro')
+def create_gemini_model():
+    """Configure Gemini AI; imported on first use so workers that never caption skip the SDK"""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+    return genai.GenerativeModel('gemini-pro')
 
-fetched_article_ids = set()
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(app.root_path, 'data'))
 
-class ArticleCache:
-    def __init__(self):
-        self.fetched_ids = {}  # Dict to store article ID and fetch time
-        self.cache_expiry = timedelta(hours=24)  # Reset cache after 24 hours
-
-    def add(self, article_id):
-        self.fetched_ids[article_id] = datetime.now()
-        self._cleanup()
-
-    def contains(self, article_id):
-        if article_id in self.fetched_ids:
-            return datetime.now() - self.fetched_ids[article_id] < self.cache_expiry
-        return False
-
-    def _cleanup(self):
-        now = datetime.now()
-        self.fetched_ids = {
-            id: time for id, time in self.fetched_ids.items() 
-            if now - time < self.cache_expiry
-        }
+class Metrics:
+    """Per-stage latency histograms and counters, aggregated across workers.
 
-article_cache = ArticleCache()
+    Each process keeps its own series and periodically snapshots them to
+    METRICS_DIR/<pid>.json; /metrics merges every snapshot. Timers observed
+    inside a request are also echoed in that response's Server-Timing header.
+    """
+    RETIRED = 'retired.json'  # counters and histograms of processes that have exited
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
 
-class NewsCache:
-    def __init__(self):
-        self.fetched_ids = {}
-        self.last_cleanup = datetime.now()
-        self.cleanup_interval = timedelta(hours=24)
+    def __init__(self, directory: str, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.counter_source = None  # callable returning (counters, gauges) at flush time
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.histograms = {}  # "name\tlabel=value" -> [bucket counts..., sum, count]
+        self.counters = {}
+        self.gauges = {}
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+
+    def _check_fork(self) -> None:
+        # Forked children (process pools) must not re-report the parent's series
+        if self._pid != os.getpid():
+            self._reset()
+
+    def observe(self, name: str, label: str, seconds: float) -> None:
+        key = f"{name}\t{label}"
+        with self._lock:
+            self._check_fork()
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(self.BUCKETS) + 2)
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('poster_stage_seconds', f'stage="{stage}"', elapsed)
+            if has_request_context():
+                timings = g.setdefault('server_timing', [])
+            else:
+                timings = request_stage_timings.get()
+            if timings is not None:
+                timings.append((stage, elapsed))
+
+    def flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        if self.counter_source is not None:
+            try:
+                counters, gauges = self.counter_source()
+            except Exception as e:
+                app.logger.warning(f"Metrics counter collection failed: {e}")
+                counters, gauges = self.counters, self.gauges
+        with self._lock:
+            self._check_fork()
+            if self.counter_source is not None:
+                self.counters, self.gauges = dict(counters), dict(gauges)
+            self._check_fork()
+            snapshot = {
+                'histograms': {k: list(v) for k, v in self.histograms.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{os.getpid()}.json")
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            app.logger.warning(f"Metrics flush failed: {e}")
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    @staticmethod
+    def _fold(merged: Dict[str, Dict[str, Any]], snapshot: Dict[str, Any], gauges: bool) -> None:
+        for key, series in snapshot.get('histograms', {}).items():
+            total = merged['histograms'].setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+        for key, value in snapshot.get('counters', {}).items():
+            merged['counters'][key] = merged['counters'].get(key, 0) + value
+        if gauges:
+            for key, value in snapshot.get('gauges', {}).items():
+                merged['gauges'][key] = merged['gauges'].get(key, 0) + value
+
+    def _retire(self, names) -> None:
+        """Fold snapshots of exited processes into RETIRED and delete them"""
+        retired_path = os.path.join(self.directory, self.RETIRED)
+        try:
+            with open(os.path.join(self.directory, 'retired.lock'), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                retired = {'histograms': {}, 'counters': {}, 'gauges': {}}
+                try:
+                    with open(retired_path) as f:
+                        self._fold(retired, json.load(f), False)
+                except (OSError, ValueError):
+                    pass
+                folded = []
+                for name in names:
+                    path = os.path.join(self.directory, name)
+                    try:
+                        with open(path) as f:
+                            self._fold(retired, json.load(f), False)
+                    except FileNotFoundError:
+                        continue
+                    except (OSError, ValueError):
+                        pass
+                    folded.append(path)
+                if not folded:
+                    return
+                del retired['gauges']
+                tmp_path = retired_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(retired, f)
+                os.replace(tmp_path, retired_path)
+                for path in folded:
+                    os.remove(path)
+        except OSError as e:
+            app.logger.warning(f"Metrics snapshot pruning failed: {e}")
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Merge every worker snapshot; gauges only count live workers.
+
+        Snapshots left by exited processes are folded into RETIRED first, so
+        the directory holds one file per live process plus one aggregate.
+        """
+        merged = {'histograms': {}, 'counters': {}, 'gauges': {}}
+        try:
+            names = [n for n in os.listdir(self.directory)
+                     if n.endswith('.json') and n[:-5].isdigit()]
+        except OSError:
+            names = []
+        dead = [n for n in names if not self._alive(int(n[:-5]))]
+        if dead:
+            self._retire(dead)
+        for name in [self.RETIRED] + [n for n in names if n not in dead]:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._fold(merged, snapshot, name != self.RETIRED)
+        return merged
+
+    def render_prometheus(self) -> str:
+        merged = self.collect()
+        lines = []
+        families = {}
+        for key in sorted(merged['histograms']):
+            families.setdefault(key.split('\t')[0], []).append(key)
+        for name, keys in families.items():
+            lines.append(f"# TYPE {name} histogram")
+            for key in keys:
+                label = key.split('\t', 1)[1]
+                series = merged['histograms'][key]
+                for bound, count in zip(self.BUCKETS, series):
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+                lines.append(f'{name}_sum{{{label}}} {series[-2]:.6f}')
+                lines.append(f'{name}_count{{{label}}} {series[-1]}')
+        for kind, metric_type in (('counters', 'counter'), ('gauges', 'gauge')):
+            seen = set()
+            for key in sorted(merged[kind]):
+                name = key.split('{')[0]
+                if name not in seen:
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    seen.add(name)
+                lines.append(f"{key} {merged[kind][key]}")
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(os.getenv('METRICS_DIR', os.path.join(DATA_DIR, 'metrics')))
+
+# Stage timings for requests served outside Flask; asgi.py sets a list per request
+request_stage_timings = contextvars.ContextVar('request_stage_timings', default=None)
+
+def server_timing_header(timings, elapsed: float) -> str:
+    """Server-Timing value with durations summed per stage, plus the total"""
+    stages = {}
+    for stage, seconds in timings:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages.items()]
+    entries.append(f"total;dur={elapsed * 1000:.1f}")
+    return ', '.join(entries)
+
+class SQLiteStore:
+    """Base for SQLite (WAL) files shared by every worker.
+
+    Connections are opened per thread and reopened after fork; SCHEMA
+    statements run on each new connection.
+    """
+    SCHEMA = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+class DedupStore(SQLiteStore):
+    """Seen-article ids shared by every worker through a SQLite (WAL) file.
+
+    Ids are stamped with a time bucket; lookups ignore expired buckets and a
+    single DELETE drops them once per bucket, so expiry is O(1) amortized.
+    """
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY, bucket INTEGER NOT NULL) WITHOUT ROWID',
+        'CREATE INDEX IF NOT EXISTS seen_bucket ON seen (bucket)',
+    )
+
+    def __init__(self, path: str, expiry: timedelta = timedelta(hours=24),
+                 bucket_seconds: int = 3600):
+        super().__init__(path)
+        self.bucket_seconds = bucket_seconds
+        self.expiry_buckets = max(1, int(expiry.total_seconds() // bucket_seconds))
+        self._purged_bucket = None
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def _purge(self, conn: sqlite3.Connection, bucket: int) -> None:
+        if self._purged_bucket == bucket:
+            return
+        conn.execute('DELETE FROM seen WHERE bucket <= ?', (bucket - self.expiry_buckets,))
+        self._purged_bucket = bucket
 
     def add(self, article_id: str) -> None:
-        self.fetched_ids[article_id] = datetime.now()
-        self._cleanup()
+        self.add_many([article_id])
+
+    def add_many(self, article_ids) -> None:
+        conn = self._connect()
+        bucket = self._bucket()
+        self._purge(conn, bucket)
+        conn.execute('BEGIN')
+        try:
+            conn.executemany('INSERT OR REPLACE INTO seen (id, bucket) VALUES (?, ?)',
+                             ((str(article_id), bucket) for article_id in article_ids))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
 
     def contains(self, article_id: str) -> bool:
-        self._cleanup()
-        return article_id in self.fetched_ids
-
-    def _cleanup(self) -> None:
-        if datetime.now() - self.last_cleanup > self.cleanup_interval:
-            cutoff = datetime.now() - self.cleanup_interval
-            self.fetched_ids = {
-                id: time for id, time in self.fetched_ids.items()
-                if time > cutoff
-            }
-            self.last_cleanup = datetime.now()
+        if not article_id:
+            return False
+        row = self._connect().execute(
+            'SELECT 1 FROM seen WHERE id = ? AND bucket > ?',
+            (str(article_id), self._bucket() - self.expiry_buckets)
+        ).fetchone()
+        return row is not None
+
+    def seen_ids(self, article_ids, chunk: int = 500) -> set:
+        """The subset of article_ids already seen, in one query per chunk"""
+        ids = [str(article_id) for article_id in article_ids if article_id]
+        conn = self._connect()
+        min_bucket = self._bucket() - self.expiry_buckets
+        seen = set()
+        for offset in range(0, len(ids), chunk):
+            part = ids[offset:offset + chunk]
+            rows = conn.execute(
+                f"SELECT id FROM seen WHERE bucket > ? AND id IN ({','.join('?' * len(part))})",
+                (min_bucket, *part)
+            )
+            seen.update(row[0] for row in rows)
+        return seen
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+news_cache = DedupStore(os.getenv('DEDUP_DB_PATH', os.path.join(DATA_DIR, 'dedup.sqlite3')))
+
+class NewsPageCache(SQLiteStore):
+    """Disk-backed cache of raw newsdata.io pages keyed by (category, page, language).
+
+    Pages are reused until ttl seconds old, so articles that were fetched but
+    not shown stay available, and the stored nextPage token lets callers move
+    on to fresh pages instead of downloading the first one again.
+    """
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS pages (category TEXT NOT NULL, page TEXT NOT NULL, '
+        'language TEXT NOT NULL, fetched_at REAL NOT NULL, body TEXT NOT NULL, '
+        'PRIMARY KEY (category, page, language)) WITHOUT ROWID',
+    )
+
+    def __init__(self, path: str, ttl: float = 900):
+        super().__init__(path)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, category: str, page: Optional[str], language: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            'SELECT body FROM pages WHERE category = ? AND page = ? AND language = ? AND fetched_at > ?',
+            (category, page or '', language, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, category: str, page: Optional[str], language: str, data: Dict[str, Any]) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute('INSERT OR REPLACE INTO pages (category, page, language, fetched_at, body) '
+                     'VALUES (?, ?, ?, ?, ?)', (category, page or '', language, now, json.dumps(data)))
+        conn.execute('DELETE FROM pages WHERE fetched_at <= ?', (now - self.ttl,))
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+news_page_cache = NewsPageCache(
+    os.getenv('NEWS_PAGE_CACHE_PATH', os.path.join(DATA_DIR, 'news_pages.sqlite3')),
+    ttl=float(os.getenv('NEWS_PAGE_TTL', 900))
+)
+
+class FontRegistry:
+    """Process-wide cache of loaded TrueType fonts keyed by (path, size)"""
+    def __init__(self):
+        self.fonts = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, size: int) -> ImageFont.FreeTypeFont:
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+        with self._lock:
+            font = self.fonts.get(key)
+            if font is None:
+                with metrics.timer('font_load'):
+                    font = ImageFont.truetype(path, size)
+                self.fonts[key] = font
+                self.misses += 1
+            else:
+                self.hits += 1
+        return font
+
+    def stats(self) -> Dict[str, int]:
+        return {'loaded': len(self.fonts), 'hits': self.hits, 'misses': self.misses}
+
+font_registry = FontRegistry()
+
+class TextWidthCache:
+    """LRU-bounded memo of advance widths keyed by font and string"""
+    def __init__(self, max_entries: int = 20000):
+        self.widths = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
 
-news_cache = NewsCache()
+    def getlength(self, font: ImageFont.FreeTypeFont, text: str) -> float:
+        key = (font.path, font.size, text)
+        with self._lock:
+            width = self.widths.get(key)
+            if width is not None:
+                self.widths.move_to_end(key)
+                self.hits += 1
+                return width
+        width = font.getlength(text)
+        with self._lock:
+            self.widths[key] = width
+            self.misses += 1
+            if len(self.widths) > self.max_entries:
+                self.widths.popitem(last=False)
+        return width
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self.widths), 'hits': self.hits, 'misses': self.misses}
+
+text_width_cache = TextWidthCache()
+
+# Bump whenever the poster layout changes so cached renders are invalidated
+TEMPLATE_VERSION = '3'
+
+class RenderCache:
+    """Content-addressed cache of encoded posters.
+
+    Keys hash the normalized fields, the template version (plus the poster
+    template's key for non-default designs) and the logo file.
+    A bounded in-memory LRU sits in front of an optional on-disk tier
+    (RENDER_CACHE_DIR) that all gunicorn workers share. The disk tier is
+    capped at disk_max_bytes: disk hits refresh a file's mtime, and every
+    sweep_interval seconds a worker that writes deletes the least recently
+    used files until the tier is back under 90% of the cap.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 1024 * 1024 * 1024, sweep_interval: float = 300.0):
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.misses = 0
+        self._logo_stamp = None
+        self._logo_digest = ''
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _logo_fingerprint(self) -> str:
+        try:
+            stat = os.stat(DEFAULT_LOGO_PATH)
+        except OSError:
+            return ''
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._logo_stamp:
+            with open(DEFAULT_LOGO_PATH, 'rb') as f:
+                self._logo_digest = hashlib.sha256(f.read()).hexdigest()
+            self._logo_stamp = stamp
+        return self._logo_digest
+
+    def key_for(self, fields: Dict[str, str], variant: str = '', design: str = '') -> str:
+        payload = {
+            'fields': fields,
+            'template': TEMPLATE_VERSION,
+            'logo': self._logo_fingerprint(),
+            'variant': variant
+        }
+        if design:
+            payload['design'] = design
+        payload = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                data = None
+            if data is not None:
+                self.disk_hits += 1
+                self._remember(key, data)
+                return data
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                app.logger.warning(f"Render cache write failed: {e}")
+            self._maybe_sweep()
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._last_sweep is not None and now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        try:
+            self.sweep_disk()
+        except OSError as e:
+            app.logger.warning(f"Render cache sweep failed: {e}")
+
+    def sweep_disk(self) -> int:
+        """Delete least recently used disk entries while the tier is over its cap"""
+        files = []
+        total = 0
+        stale_tmp = time.time() - 3600
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith('.tmp'):
+                    # Left behind by a worker killed mid-write
+                    if stat.st_mtime < stale_tmp:
+                        with suppress(OSError):
+                            os.remove(path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return 0
+        files.sort()
+        target = self.disk_max_bytes * 0.9
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another worker's sweep got there first
+            total -= size
+            removed += 1
+        self.disk_evictions += removed
+        return removed
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'disk_evictions': self.disk_evictions,
+            'misses': self.misses
+        }
+
+render_cache = RenderCache(
+    max_bytes=int(os.getenv('RENDER_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    disk_dir=os.getenv('RENDER_CACHE_DIR') or None,
+    disk_max_bytes=int(os.getenv('RENDER_CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024))
+)
 
 def wrap_text(text, font, max_width):
     """Text wrapping function"""
-    lines = []
+    return wrap_text_with_widths(text, font, max_width)[0]
+
+def _greedy_breaks(prefix, max_width):
+    """Break positions filling each line as far as it fits (first word always placed)"""
+    breaks, start, count = [], 0, len(prefix) - 1
+    while start < count:
+        end = start + 1
+        while end < count and prefix[end + 1] - prefix[start] <= max_width:
+            end += 1
+        breaks.append(end)
+        start = end
+    return breaks
+
+def _balanced_breaks(prefix, space_width, max_width):
+    """Minimum-raggedness breaks (Knuth-Plass style dynamic program).
+
+    Minimizes the summed squared slack of every line but the last. Each line
+    also carries a penalty larger than any possible raggedness, so the result
+    never uses more lines than the greedy wrap.
+    """
+    count = len(prefix) - 1
+    line_penalty = (max_width ** 2) * (count + 1)
+    best = [0.0] * (count + 1)
+    next_break = [count] * (count + 1)
+    for start in range(count - 1, -1, -1):
+        best[start] = float('inf')
+        for end in range(start + 1, count + 1):
+            width = prefix[end] - prefix[start] - space_width
+            if width > max_width and end > start + 1:
+                break
+            slack = 0.0 if end == count else max(max_width - width, 0.0)
+            cost = slack * slack + line_penalty + best[end]
+            if cost < best[start]:
+                best[start] = cost
+                next_break[start] = end
+    breaks, start = [], 0
+    while start < count:
+        start = next_break[start]
+        breaks.append(start)
+    return breaks
+
+def wrap_text_with_widths(text, font, max_width, mode='greedy'):
+    """Wrap text and return (lines, line widths).
+
+    Every word is measured once (through text_width_cache) and break
+    candidates come from cumulative advance widths, so wrapping is linear in
+    the number of words and callers can align lines without measuring them
+    again. mode='balanced' picks minimum-raggedness breaks instead of greedy.
+    """
+    lines, widths = [], []
+    space_width = text_width_cache.getlength(font, ' ')
     for paragraph in text.split('\n'):
         if not paragraph:
             lines.append('')
+            widths.append(0.0)
             continue
-        
+
         words = paragraph.split()
-        current_line = []
-        current_width = 0
+        if not words:
+            continue
 
+        # prefix[i] is the advance of words[:i], each followed by a space
+        prefix = [0.0]
         for word in words:
-            word_width = font.getlength(word + ' ')
-            if current_width + word_width > max_width:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-                current_width = word_width
-            else:
-                current_line.append(word)
-                current_width += word_width
+            prefix.append(prefix[-1] + text_width_cache.getlength(font, word) + space_width)
+
+        if mode == 'balanced':
+            breaks = _balanced_breaks(prefix, space_width, max_width)
+        else:
+            breaks = _greedy_breaks(prefix, max_width)
 
-        if current_line:
-            lines.append(' '.join(current_line))
+        start = 0
+        for end in breaks:
+            lines.append(' '.join(words[start:end]))
+            widths.append(prefix[end] - prefix[start] - space_width)
+            start = end
 
-    return lines
+    return lines, widths
 
 def calculate_text_height(lines, font_size, line_spacing):
     """Calculate total height needed for text block"""
     return len(lines) * int(font_size * line_spacing)
 
-def draw_separator_line(draw, y_position, width, padding):
+def draw_separator_line(draw, y_position, width, padding, color='#8A8A8A'):
     """Draw a subtle separator line"""
     draw.line(
         [(padding, y_position), (width - padding, y_position)],
-        fill='#8A8A8A',
+        fill=color,
         width=1
     )
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', poster_templates=poster_templates.names())
 
 @app.route("/health")
 def health():
     app.logger.info("Health check route accessed.")
     return "OK", 200
 
+@app.route("/cache-stats")
+def cache_stats():
+    """Hit/miss counters for the per-worker render caches"""
+    return jsonify({
+        'fonts': font_registry.stats(),
+        'text_widths': text_width_cache.stats(),
+        'renders': render_cache.stats(),
+        'layouts': poster_layout.plans.stats(),
+        'poster_templates': poster_templates.stats(),
+        'article_pool': article_pool.stats(),
+        'social': caption_service.stats(),
+        'news_pages': news_page_cache.stats()
+    })
+
+def cache_counters():
+    """Cache counters and gauges for /metrics, from the same stats as /cache-stats"""
+    counter_keys = {'hits', 'misses', 'disk_hits', 'disk_evictions', 'served', 'empty', 'refills',
+                    'coalesced', 'upstream_calls', 'upstream_errors', 'loads', 'errors'}
+    gauge_keys = {'entries', 'bytes', 'loaded', 'size', 'compiled'}
+    sources = {
+        'fonts': font_registry.stats(),
+        'text_widths': text_width_cache.stats(),
+        'renders': render_cache.stats(),
+        'layouts': poster_layout.plans.stats(),
+        'poster_templates': poster_templates.stats(),
+        'article_pool': article_pool.stats(),
+        'social': caption_service.stats(),
+        'social_responses': caption_service.cache.stats(),
+        'news_pages': news_page_cache.stats(),
+    }
+    counters, gauges = {}, {}
+    for cache, stats in sources.items():
+        for key, value in stats.items():
+            if key in counter_keys:
+                counters[f'poster_cache_{key}_total{{cache="{cache}"}}'] = value
+            elif key in gauge_keys:
+                gauges[f'poster_cache_{key}{{cache="{cache}"}}'] = value
+    return counters, gauges
+
+metrics.counter_source = cache_counters
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('poster_request_seconds', f'route="{route}"', elapsed)
+        response.headers['Server-Timing'] = server_timing_header(g.pop('server_timing', []), elapsed)
+    metrics.flush()
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition merged across all workers"""
+    metrics.flush(force=True)
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 def smart_truncate(text, max_length):
     """Intelligently truncate text at sentence boundaries"""
     if len(text) <= max_length:
@@ -167,61 +834,211 @@ def smart_truncate(text, max_length):
     last_sentence_end = max(positions)
     return text[:last_sentence_end].strip()
 
-def is_valid_article(article):
-    """Check if article has enough content and proper character counts"""
-    return (
-        article.get('title') and 
-        article.get('description') and
-        article.get('content') and
-        len(article['title']) >= 20 and len(article['title']) <= 52 and  # Tag line limit
-        len(article['description']) >= 100 and len(article['description']) <= 200 and  # Caption limit
-        len(article.get('content', '')) >= 200 and len(article.get('content', '')) <= 500 and  # Main content limit
-        not any(x in article['title'].upper() for x in ['N/A', 'NULL', 'UNDEFINED']) and
-        article['title'].strip() and
-        article['description'].strip() and
-        article.get('content', '').strip() and
-        article.get('article_id') not in fetched_article_ids  # Check if already fetched
-    )
+# Upstream news API
+NEWSDATA_API_URL = os.getenv('NEWSDATA_API_URL', 'https://newsdata.io/api/1/news')
+NEWS_CATEGORIES = ['technology', 'business', 'science', 'top', 'world']
+NEWS_FETCH_DEADLINE = float(os.getenv('NEWS_FETCH_DEADLINE', 8))
+NEWS_FETCH_ATTEMPTS = 3
+# Pages to walk per category when the cached ones hold no unseen articles
+NEWS_MAX_PAGES = int(os.getenv('NEWS_MAX_PAGES', 3))
+# Each fetch uses one thread per category; leave room for concurrent fetches in async mode
+NEWS_FETCH_THREADS = int(os.getenv('NEWS_FETCH_THREADS', len(NEWS_CATEGORIES) * 4))
 
-def is_recent_article(article, days=7):  # Changed from hours to days
-    """Check if article is within specified days"""
+_http_session = None
+_http_session_lock = threading.Lock()
+_news_executor = ThreadPoolExecutor(max_workers=NEWS_FETCH_THREADS, thread_name_prefix='news-fetch')
+
+def get_http_session() -> 'requests.Session':
+    """Process-wide keep-alive session for upstream HTTP calls"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                # Imported here so workers that never fetch news skip loading requests
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=NEWS_FETCH_THREADS)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session = session
+    return _http_session
+
+# Article ingestion
+# Character bounds per field, matching the poster slots they fill
+ARTICLE_LENGTH_LIMITS = {
+    'title': (30, 52),          # Tag line
+    'description': (100, 200),  # Captions
+    'content': (200, 500),      # Main content
+}
+PLACEHOLDER_TITLES = ('N/A', 'NULL', 'UNDEFINED')
+# Articles published longer ago than this are never served
+NEWS_MAX_AGE_DAYS = float(os.getenv('NEWS_MAX_AGE_DAYS', 7))
+
+def published_timestamp(article) -> Optional[float]:
+    """pubDate as epoch seconds (newsdata.io dates are UTC); None if missing or unparseable"""
     try:
         pub_date = datetime.fromisoformat(article['pubDate'].replace('Z', '+00:00'))
-        return datetime.now(pub_date.tzinfo) - pub_date < timedelta(days=days)
-    except (KeyError, ValueError):
-        return True  # If we can't parse date, consider it valid
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return None
+    if pub_date.tzinfo is None:
+        pub_date = pub_date.replace(tzinfo=timezone.utc)
+    return pub_date.timestamp()
 
-def fetch_single_news(api_key: str, category: str, page: int = 0) -> Optional[Dict[Any, Any]]:
-    """Fetch news with pagination support"""
-    base_url = "https://newsdata.io/api/1/news"
-    params = {
-        'apikey': api_key,
-        'category': category,
-        'language': 'en',
-        'size': 10,
-        'page': page
-    }
-    
+def recency_cutoff(days: float = NEWS_MAX_AGE_DAYS) -> float:
+    """Oldest publish timestamp still considered recent"""
+    return time.time() - days * 86400
+
+def is_recent_article(article, days=7):  # Changed from hours to days
+    """Check if article is within specified days"""
+    published = published_timestamp(article)
+    return published is None or published >= recency_cutoff(days)  # If we can't parse date, consider it valid
+
+class ArticleRecord:
+    """One validated upstream article, normalized once at ingestion"""
+    __slots__ = ('article_id', 'title', 'description', 'content', 'source_id', 'category',
+                 'published', 'fetched_at')
+
+    def __init__(self, article_id: str, title: str, description: str, content: str,
+                 source_id: str, category: str, published: Optional[float], fetched_at: float):
+        self.article_id = article_id
+        self.title = title
+        self.description = description
+        self.content = content
+        self.source_id = source_id
+        self.category = category
+        self.published = published
+        self.fetched_at = fetched_at
+
+    def sort_key(self) -> float:
+        # Undated articles count as just published (see is_recent_article)
+        return self.published if self.published is not None else time.time()
+
+    def summary(self) -> Dict[str, str]:
+        """Normalized fields /fetch-news needs"""
+        return {
+            'title': self.title,
+            'description': self.description,
+            'content': self.content,
+            'source_id': self.source_id,
+            'category': self.category,
+            'article_id': self.article_id
+        }
+
+def ingest_articles(raw_articles, fetched_at: Optional[float] = None) -> list:
+    """Validate and normalize a batch of raw upstream articles in one pass.
+
+    Each text field is converted and stripped once and checked against
+    ARTICLE_LENGTH_LIMITS; ids already shown are dropped with a single
+    DedupStore query for the whole batch. Returns ArticleRecords.
+    """
+    if fetched_at is None:
+        fetched_at = time.monotonic()
+    records = []
+    limits = [(name, low, high) for name, (low, high) in ARTICLE_LENGTH_LIMITS.items()]
+    for article in raw_articles:
+        if not isinstance(article, dict) or not article.get('article_id'):
+            continue
+        values = []
+        for name, low, high in limits:
+            value = str(article.get(name, '')).strip()
+            if not (low <= len(value) <= high and value.isprintable()):
+                break
+            values.append(value)
+        else:
+            title, description, content = values
+            upper = title.upper()
+            if any(marker in upper for marker in PLACEHOLDER_TITLES):
+                continue
+            records.append(ArticleRecord(
+                str(article['article_id']), title, description, content,
+                str(article.get('source_id', 'NEWS')), str(article.get('category', 'Breaking News')),
+                published_timestamp(article), fetched_at
+            ))
+    if not records:
+        return records
+    seen = news_cache.seen_ids(record.article_id for record in records)
+    return [record for record in records if record.article_id not in seen]
+
+class ArticleIndex:
+    """ArticleRecords indexed by category and publish time.
+
+    Each category's records are kept sorted oldest to newest, so taking the
+    newest article is a pop from the end and dropping everything older than
+    the recency window is one bisect and slice. Not thread-safe; callers lock.
+    """
+    def __init__(self, categories, max_age_days: float = NEWS_MAX_AGE_DAYS):
+        self.max_age_days = max_age_days
+        self.records = {category: [] for category in categories}
+        self.keys = {category: [] for category in categories}
+        self.ids = set()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, article_id: str) -> bool:
+        return article_id in self.ids
+
+    def add(self, category: str, records) -> int:
+        bucket = self.records.setdefault(category, [])
+        keys = self.keys.setdefault(category, [])
+        cutoff = recency_cutoff(self.max_age_days)
+        added = 0
+        for record in records:
+            key = record.sort_key()
+            if key < cutoff or record.article_id in self.ids:
+                continue
+            position = bisect.bisect_right(keys, key)
+            keys.insert(position, key)
+            bucket.insert(position, record)
+            self.ids.add(record.article_id)
+            added += 1
+        return added
+
+    def prune(self, category: str) -> None:
+        """Drop records published before the recency window"""
+        keys = self.keys.get(category)
+        if not keys:
+            return
+        stale = bisect.bisect_left(keys, recency_cutoff(self.max_age_days))
+        if stale:
+            for record in self.records[category][:stale]:
+                self.ids.discard(record.article_id)
+            del self.records[category][:stale]
+            del keys[:stale]
+
+    def take(self, category: str) -> Optional[ArticleRecord]:
+        """Remove and return the newest recent record in category"""
+        self.prune(category)
+        bucket = self.records.get(category)
+        if not bucket:
+            return None
+        self.keys[category].pop()
+        record = bucket.pop()
+        self.ids.discard(record.article_id)
+        return record
+
+    def categories(self):
+        """Categories that currently hold records"""
+        return [category for category, bucket in self.records.items() if bucket]
+
+    def counts(self) -> Dict[str, int]:
+        return {category: len(bucket) for category, bucket in self.records.items()}
+
+def fetch_single_news(api_key: str, category: str, page: Optional[str] = None) -> Optional[Dict[Any, Any]]:
+    """Fetch news with pagination support (page is a newsdata.io nextPage token)"""
     try:
-        response = requests.get(base_url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_news_page(api_key, category, page or None,
+                               deadline=time.monotonic() + 15, max_attempts=1)
         
-        if not data.get('results'):
+        if not data or not isinstance(data.get('results'), list):
             return None
             
-        # Filter and sort articles
-        available_articles = []
-        for article in data['results']:
-            if (article.get('article_id') and 
-                not news_cache.contains(article['article_id']) and 
-                is_valid_article(article)):
-                available_articles.append(article)
-        
+        available_articles = ingest_articles(data['results'])
         if available_articles:
             selected = choice(available_articles)
-            news_cache.add(selected['article_id'])
-            return selected
+            news_cache.add(selected.article_id)
+            return selected.summary()
             
         return None
         
@@ -229,77 +1046,137 @@ def fetch_single_news(api_key: str, category: str, page: int = 0) -> Optional[Di
         app.logger.warning(f"Error fetching news: {str(e)}")
         return None
 
-def validate_article_content(article: Dict[str, Any]) -> bool:
-    """Validate article content and character lengths"""
+def parse_retry_after(value: Optional[str], default: float = 2.0) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return default
     try:
-        title = str(article.get('title', '')).strip()
-        description = str(article.get('description', '')).strip()
-        content = str(article.get('content', '')).strip()
-        
-        # Character length requirements
-        return (
-            len(title) >= 30 and len(title) <= 52 and  # Tag line
-            len(description) >= 100 and len(description) <= 200 and  # Captions
-            len(content) >= 200 and len(content) <= 500 and  # Main content
-            title.isprintable() and
-            description.isprintable() and
-            content.isprintable()
-        )
-    except:
-        return False
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+def fetch_news_page(api_key: str, category: str, page: Optional[str] = None, language: str = 'en',
+                    deadline: Optional[float] = None,
+                    max_attempts: int = NEWS_FETCH_ATTEMPTS) -> Optional[Dict[str, Any]]:
+    """One newsdata.io page, from the page cache when fresh.
+
+    Rate-limited responses are retried after Retry-After while the deadline
+    allows; returns None if the deadline passes first.
+    """
+    cached = news_page_cache.get(category, page, language)
+    if cached is not None:
+        return cached
+
+    if deadline is None:
+        deadline = time.monotonic() + NEWS_FETCH_DEADLINE
+    params = {
+        'apikey': api_key,
+        'category': category,
+        'language': language,
+        'size': 10
+    }
+    if page:
+        params['page'] = page
+
+    session = get_http_session()
+    for _ in range(max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        with metrics.timer('news_http'):
+            response = session.get(NEWSDATA_API_URL, params=params, timeout=min(15, remaining))
+
+        if response.status_code in (429, 503):
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+            if time.monotonic() + delay >= deadline:
+                return None
+            with metrics.timer('news_backoff'):
+                time.sleep(delay)
+            continue
 
-def fetch_news_with_retry(api_key: str) -> Dict[str, Any]:
-    """Fetch news with strict content validation"""
-    categories = ['technology', 'business', 'science', 'top', 'world']
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data.get('results'), list):
+            news_page_cache.put(category, page, language, data)
+        return data
+    return None
+
+def fetch_category_articles(api_key: str, category: str, deadline: float,
+                            max_attempts: int = NEWS_FETCH_ATTEMPTS,
+                            max_pages: int = NEWS_MAX_PAGES) -> list:
+    """Valid, unseen ArticleRecords for one category.
+
+    Starts from the (cached) first page and follows nextPage tokens while
+    every article on the current page has already been shown.
+    """
+    page = None
+    for _ in range(max_pages):
+        data = fetch_news_page(api_key, category, page, deadline=deadline, max_attempts=max_attempts)
+        if not data:
+            return []
+        articles = []
+        if isinstance(data.get('results'), list):
+            articles = ingest_articles(data['results'])
+        if articles:
+            return articles
+        page = data.get('nextPage')
+        if not page:
+            break
+    return []
+
+def fetch_news_with_retry(api_key: str, deadline: Optional[float] = None,
+                          fallback: bool = True, categories=None) -> Optional[Dict[str, Any]]:
+    """Fetch news with strict content validation.
+
+    The categories (default NEWS_CATEGORIES) are requested concurrently over
+    the shared session; once the deadline passes, whatever categories have
+    finished are used. With nothing usable, returns the canned fallback
+    article (or None if fallback is False).
+    """
+    categories = list(categories or NEWS_CATEGORIES)
     shuffle(categories)
+    if deadline is None:
+        deadline = time.monotonic() + NEWS_FETCH_DEADLINE
     all_valid_articles = []
-    
-    for category in categories:
-        try:
-            response = requests.get(
-                "https://newsdata.io/api/1/news",
-                params={
-                    'apikey': api_key,
-                    'category': category,
-                    'language': 'en',
-                    'size': 10
-                },
-                timeout=15
-            )
-            
-            if response.status_code == 429:
-                time.sleep(2)
-                continue
-                
-            data = response.json()
-            
-            if isinstance(data.get('results'), list):
-                for article in data['results']:
-                    if (isinstance(article, dict) and
-                        validate_article_content(article) and
-                        not news_cache.contains(article.get('article_id', ''))):
-                        all_valid_articles.append(article)
-            
-            time.sleep(1)
-            
-        except Exception as e:
-            app.logger.warning(f"Error fetching {category} news: {str(e)}")
-            continue
+
+    cutoff = recency_cutoff()
+    for articles in fetch_articles_by_category(api_key, categories, deadline).values():
+        all_valid_articles.extend(a for a in articles if a.published is None or a.published >= cutoff)
     
     # Select random article from collected valid articles
     if all_valid_articles:
         selected = choice(all_valid_articles)
-        news_cache.add(selected.get('article_id', str(time.time())))
-        return {
-            'title': str(selected['title']).strip(),
-            'description': str(selected['description']).strip(),
-            'content': str(selected.get('content', selected['description'])).strip(),
-            'source_id': str(selected.get('source_id', 'NEWS')),
-            'category': str(selected.get('category', 'Breaking News')),
-            'article_id': str(selected.get('article_id', f'article_{time.time()}'))
-        }
+        news_cache.add(selected.article_id)
+        return selected.summary()
     
-    # Fallback content with proper character counts
+    return fallback_article() if fallback else None
+
+def fetch_articles_by_category(api_key: str, categories, deadline: float) -> Dict[str, list]:
+    """Fetch categories concurrently, keeping whatever finished before the deadline"""
+    futures = {
+        _news_executor.submit(fetch_category_articles, api_key, category, deadline): category
+        for category in categories
+    }
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+    if not_done:
+        app.logger.warning(f"News fetch deadline reached; skipping {sorted(futures[f] for f in not_done)}")
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            app.logger.warning(f"Error fetching {futures[future]} news: {str(e)}")
+    return results
+
+def fallback_article() -> Dict[str, Any]:
+    """Fallback content with proper character counts"""
     return {
         'title': 'Innovation and Technology Shape Our Digital Future',
         'description': 'Breakthrough developments in artificial intelligence and sustainable technology continue to transform industries worldwide, creating new opportunities for growth and innovation.',
@@ -309,30 +1186,157 @@ def fetch_news_with_retry(api_key: str) -> Dict[str, Any]:
         'article_id': f'fallback_{int(time.time())}'
     }
 
-@app.route('/fetch-news')
-def fetch_news():
-    """News fetching endpoint with error handling"""
-    try:
+class ArticlePool:
+    """Validated, unseen articles kept ready for /fetch-news.
+
+    Articles live in an ArticleIndex keyed by the category they were fetched
+    for, so a pop is an index lookup returning the newest recent article. A
+    background thread refills the pool when it drops below low_water and tops
+    it up every refresh_interval seconds; entries held longer than max_age
+    seconds are skipped.
+    """
+    def __init__(self, low_water: int = 5, target: int = 30, refresh_interval: float = 600,
+                 max_age: float = 6 * 3600):
+        self.index = ArticleIndex(NEWS_CATEGORIES)
+        self.low_water = low_water
+        self.target = target
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.refills = 0
+        self.served = 0
+        self.empty = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def start(self) -> bool:
+        """Start the refresher thread once per process (threads do not survive fork).
+
+        Returns True if the thread was started by this call.
+        """
+        if self._thread is not None and self._pid == os.getpid():
+            return False
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='article-pool', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if len(self) < self.target:
+                    self.refill()
+            except Exception as e:
+                app.logger.warning(f"Article pool refill failed: {e}")
+            # Requests that arrived during the refill were just satisfied
+            self._wakeup.clear()
+            self._wakeup.wait(self.refresh_interval)
+
+    def request_refill(self) -> None:
+        if not self.start():
+            self._wakeup.set()
+
+    def refill(self) -> int:
         api_key = os.getenv('NEWSDATA_API_KEY')
         if not api_key:
-            raise ValueError("API key not configured")
+            return 0
+        deadline = time.monotonic() + NEWS_FETCH_DEADLINE
+        fetched = fetch_articles_by_category(api_key, NEWS_CATEGORIES, deadline)
+        added = 0
+        with self._lock:
+            for category, articles in fetched.items():
+                added += self.index.add(category, articles)
+            self.refills += 1
+        return added
 
-        article = fetch_news_with_retry(api_key)
-        
-        return jsonify({
-            "tag_line": smart_truncate(str(article['title']).strip(), 52).upper(),
-            "after_tag": smart_truncate(str(article['description']).strip(), 55),
-            "main_content": smart_truncate(str(article.get('content', article['description'])).strip(), 500),
-            "company_name": str(article.get('source_id', 'NEWS'))[:5].upper(),
-            "side_note": str(article.get('category', 'Breaking News')).title()[:40],
-            "first_caption": smart_truncate(str(article['description']).strip(), 200),
-            "second_caption": smart_truncate(str(article.get('content', article['description'])).strip(), 200),
-            "big_question": f"WHAT'S NEXT FOR {str(article.get('category', 'THIS STORY')).upper()}?"[:51]
-        })
+    def pop(self, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Next unseen article, optionally from one category; None if the pool is empty"""
+        article = None
+        with self._lock:
+            if category:
+                candidates = [category]
+            else:
+                candidates = self.index.categories()
+                shuffle(candidates)
+            cutoff = time.monotonic() - self.max_age
+            for name in candidates:
+                record = self.index.take(name)
+                while record is not None:
+                    if record.fetched_at >= cutoff and not news_cache.contains(record.article_id):
+                        article = record
+                        break
+                    record = self.index.take(name)
+                if article:
+                    break
+        if article:
+            news_cache.add(article.article_id)
+            self.served += 1
+        else:
+            self.empty += 1
+        if len(self) < self.low_water:
+            self.request_refill()
+        return article.summary() if article else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self),
+            'by_category': self.index.counts(),
+            'served': self.served,
+            'empty': self.empty,
+            'refills': self.refills
+        }
+
+article_pool = ArticlePool(
+    low_water=int(os.getenv('NEWS_POOL_LOW_WATER', 5)),
+    target=int(os.getenv('NEWS_POOL_TARGET', 30)),
+    refresh_interval=float(os.getenv('NEWS_POOL_REFRESH', 600))
+)
+
+def next_article(category: Optional[str] = None, fallback: bool = True) -> Optional[Dict[str, Any]]:
+    """Next unseen article, marked as shown in news_cache.
+
+    Served from the prefetched pool; only when the pool has nothing for the
+    requested category does it go upstream, for that category alone.
+    """
+    api_key = os.getenv('NEWSDATA_API_KEY')
+    if not api_key:
+        raise ValueError("API key not configured")
+
+    article = article_pool.pop(category)
+    if article is None:
+        with metrics.timer('news_fetch'):
+            article = fetch_news_with_retry(api_key, fallback=fallback,
+                                            categories=[category] if category else None)
+    return article
+
+def article_poster_fields(article: Dict[str, Any]) -> Dict[str, str]:
+    """Poster fields for an article summary"""
+    return {
+        "tag_line": smart_truncate(str(article['title']).strip(), 52).upper(),
+        "after_tag": smart_truncate(str(article['description']).strip(), 55),
+        "main_content": smart_truncate(str(article.get('content', article['description'])).strip(), 500),
+        "company_name": str(article.get('source_id', 'NEWS'))[:5].upper(),
+        "side_note": str(article.get('category', 'Breaking News')).title()[:40],
+        "first_caption": smart_truncate(str(article['description']).strip(), 200),
+        "second_caption": smart_truncate(str(article.get('content', article['description'])).strip(), 200),
+        "big_question": f"WHAT'S NEXT FOR {str(article.get('category', 'THIS STORY')).upper()}?"[:51]
+    }
+
+def fetch_news_payload(category: Optional[str] = None) -> Dict[str, str]:
+    """Poster fields for the next article, or the canned fallback on any error"""
+    try:
+        return article_poster_fields(next_article(category))
 
     except Exception as e:
         app.logger.error(f"Error in fetch-news: {str(e)}")
-        return jsonify({
+        return {
             "tag_line": "BREAKING: INNOVATION DRIVES CHANGE",
             "after_tag": "New developments reshape our future",
             "main_content": "Technological breakthroughs continue to emerge, transforming industries.",
@@ -341,192 +1345,1623 @@ def fetch_news():
             "first_caption": "Innovation continues to accelerate across sectors.",
             "second_caption": "Experts predict more breakthrough developments ahead.",
             "big_question": "WHAT'S NEXT FOR INNOVATION?"
-        })
+        }
 
-@app.route('/generate', methods=['POST'])
-def generate_image():
+@app.route('/fetch-news')
+def fetch_news():
+    """News fetching endpoint with error handling"""
+    return jsonify(fetch_news_payload(request.args.get('category')))
+
+class PosterBackground:
+    """Invariant poster layer rendered once per worker.
+
+    Holds the canvas colour with the resized logo already composited, so each
+    request only copies it and draws the variable text. Rebuilt when the logo
+    file changes; a logo_path of None gives a plain canvas.
+    """
+    def __init__(self, size=(1080, 1080), color='#A4A5A6', logo_path=DEFAULT_LOGO_PATH,
+                 logo_size=(90, 90), logo_position=(1080 - 50 - 40, 1080 - 50 - 40)):
+        self.size = size
+        self.color = color
+        self.logo_path = logo_path
+        self.logo_size = logo_size
+        self.logo_position = logo_position
+        self.builds = 0
+        self._base = None
+        self._logo_stamp = None
+        self._lock = threading.Lock()
+
+    def _current_logo_stamp(self):
+        if not self.logo_path:
+            return None
+        try:
+            stat = os.stat(self.logo_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _build(self) -> Image.Image:
+        base = Image.new('RGB', self.size, self.color)
+        if self.logo_path:
+            try:
+                with metrics.timer('logo_paste'):
+                    logo = Image.open(self.logo_path)
+                    logo = logo.resize(self.logo_size)
+                    base.paste(logo, self.logo_position, logo if 'A' in logo.getbands() else None)
+            except Exception as e:
+                app.logger.error(f"Error adding logo: {e}")
+        self.builds += 1
+        return base
+
+    def get(self) -> Image.Image:
+        """Shared base image; callers must not draw on it directly"""
+        stamp = self._current_logo_stamp()
+        if self._base is None or stamp != self._logo_stamp:
+            with self._lock:
+                if self._base is None or stamp != self._logo_stamp:
+                    self._base = self._build()
+                    self._logo_stamp = stamp
+        return self._base
+
+    def new_canvas(self) -> Image.Image:
+        return self.get().copy()
+
+poster_background = PosterBackground()
+
+class LRUCache:
+    """Small thread-safe LRU mapping with hit/miss counters"""
+    def __init__(self, max_entries: int = 1024):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+class TextSection:
+    """Declarative description of one block of poster text.
+
+    overlay sections are drawn at the top of the previous section without
+    taking vertical space; pin_bottom sections are pushed up so they end
+    above the layout's bottom reserve. wrap_mode is 'greedy' or 'balanced'
+    (minimum raggedness).
+    """
+    def __init__(self, field: str, font_path: str, font_size: int, align: str = 'left',
+                 width_fraction: float = 1.0, wrap: bool = True, separator: bool = True,
+                 overlay: bool = False, pin_bottom: bool = False, wrap_mode: str = 'greedy'):
+        self.field = field
+        self.font_path = font_path
+        self.font_size = font_size
+        self.align = align
+        self.width_fraction = width_fraction
+        self.wrap = wrap
+        self.separator = separator
+        self.overlay = overlay
+        self.pin_bottom = pin_bottom
+        self.wrap_mode = wrap_mode
+
+class LayoutPlan:
+    """Result of the measurement pass: draw operations in paint order.
+
+    Each op is ('text', x, y, line, font) or ('separator', y).
+    """
+    def __init__(self, ops, section_spacing: int, font_scale: float):
+        self.ops = ops
+        self.section_spacing = section_spacing
+        self.font_scale = font_scale
+
+class PosterLayout:
+    """Measures and draws a stack of TextSections in two passes.
+
+    Content that would overflow the canvas is fitted by first trying each of
+    the section spacings in turn and then shrinking all fonts in steps down to
+    min_font_scale. Measured plans are cached per distinct set of field values.
+    """
+    def __init__(self, sections, size=(1080, 1080), padding: int = 40, line_spacing: float = 1.1,
+                 section_spacings=(15, 9), bottom_reserve: int = 90, min_font_scale: float = 0.7,
+                 font_scale_step: float = 0.05, text_color: str = 'black',
+                 separator_color: str = '#8A8A8A', cache_size: int = 512):
+        self.sections = sections
+        self.size = size
+        self.padding = padding
+        self.line_spacing = line_spacing
+        self.section_spacings = section_spacings
+        self.bottom_reserve = bottom_reserve
+        self.min_font_scale = min_font_scale
+        self.font_scale_step = font_scale_step
+        self.text_color = text_color
+        self.separator_color = separator_color
+        self.plans = LRUCache(cache_size)
+
+    def resized(self, size) -> 'PosterLayout':
+        """The same design laid out for another canvas size"""
+        return PosterLayout(self.sections, size, self.padding, self.line_spacing, self.section_spacings,
+                            self.bottom_reserve, self.min_font_scale, self.font_scale_step, self.text_color,
+                            self.separator_color, self.plans.max_entries)
+
+    @property
+    def max_width(self) -> int:
+        return self.size[0] - (self.padding * 2)
+
+    def font_scales(self):
+        scale = 1.0
+        while scale >= self.min_font_scale - 1e-9:
+            yield round(scale, 4)
+            scale -= self.font_scale_step
+
+    def load_fonts(self, scale: float = 1.0) -> Dict[str, ImageFont.FreeTypeFont]:
+        return {
+            section.field: font_registry.get(section.font_path, max(1, int(section.font_size * scale)))
+            for section in self.sections
+        }
+
+    def _measure_section(self, section: TextSection, text: str, font: ImageFont.FreeTypeFont):
+        if section.wrap:
+            lines, widths = wrap_text_with_widths(text, font, self.max_width * section.width_fraction,
+                                                  section.wrap_mode)
+        else:
+            lines = [text]
+            widths = [0.0 if section.align == 'left' else text_width_cache.getlength(font, text)]
+        line_height = int(font.size * self.line_spacing)
+        return lines, widths, line_height, calculate_text_height(lines, font.size, self.line_spacing)
+
+    def _flow_height(self, measured, spacing: int) -> int:
+        flowing = [m[-1] for m in measured if not m[0].overlay]
+        return (self.padding + sum(flowing) + spacing * max(len(flowing) - 1, 0)
+                + self.bottom_reserve)
+
+    def measure(self, fields: Dict[str, str]) -> LayoutPlan:
+        key = tuple(fields.get(section.field, '') for section in self.sections)
+        plan = self.plans.get(key)
+        if plan is not None:
+            return plan
+
+        canvas_height = self.size[1]
+        chosen = None
+        for scale in self.font_scales():
+            fonts = self.load_fonts(scale)
+            measured = []
+            for section in self.sections:
+                font = fonts[section.field]
+                lines, widths, line_height, height = self._measure_section(
+                    section, fields.get(section.field, ''), font)
+                measured.append((section, font, lines, widths, line_height, height))
+            for spacing in self.section_spacings:
+                chosen = (scale, spacing, measured)
+                if self._flow_height(measured, spacing) <= canvas_height:
+                    break
+            else:
+                continue
+            break
+
+        scale, spacing, measured = chosen
+        plan = self._place(measured, spacing, scale)
+        self.plans.put(key, plan)
+        return plan
+
+    def _line_x(self, section: TextSection, line_width: float) -> float:
+        if section.align == 'left':
+            return self.padding
+        if section.align == 'right':
+            return self.size[0] - self.padding - line_width
+        return (self.size[0] - line_width) / 2
+
+    def _place(self, measured, spacing: int, scale: float) -> LayoutPlan:
+        ops = []
+        pending_separator = None
+        current_y = self.padding
+        section_top = current_y
+        for section, font, lines, widths, line_height, height in measured:
+            if section.overlay:
+                y = section_top
+            else:
+                if pending_separator is not None:
+                    ops.append(('separator', pending_separator))
+                    pending_separator = None
+                if section.pin_bottom:
+                    remaining_space = self.size[1] - self.bottom_reserve - current_y
+                    if remaining_space < height:
+                        current_y = self.size[1] - self.bottom_reserve - height
+                section_top = current_y
+                y = current_y
+            for line, line_width in zip(lines, widths):
+                ops.append(('text', self._line_x(section, line_width), y, line, font))
+                y += line_height
+            if section.overlay:
+                continue
+            current_y = section_top + height + spacing
+            if section.separator:
+                pending_separator = current_y - 5
+        if pending_separator is not None:
+            ops.append(('separator', pending_separator))
+        return LayoutPlan(ops, spacing, scale)
+
+    def draw(self, draw: ImageDraw.ImageDraw, plan: LayoutPlan, offset=(0, 0)) -> None:
+        """Rasterize a plan; offset places the layout box inside a larger canvas"""
+        dx, dy = offset
+        for op in plan.ops:
+            if op[0] == 'text':
+                _, x, y, line, font = op
+                draw.text((x + dx, y + dy), line, font=font, fill=self.text_color)
+            else:
+                draw_separator_line(draw, op[1] + dy, self.size[0] + 2 * dx, self.padding + dx,
+                                    self.separator_color)
+
+    def render(self, fields: Dict[str, str], background: Image.Image) -> Image.Image:
+        with metrics.timer('text_layout'):
+            plan = self.measure(fields)
+        with metrics.timer('draw'):
+            img = background.copy()
+            self.draw(ImageDraw.Draw(img), plan)
+        return img
+
+poster_layout = PosterLayout([
+    TextSection('tag_line', ROBOTO_BOLD_PATH, 57, align='right'),
+    TextSection('after_tag', ROBOTO_PATH, 37),
+    TextSection('main_content', ROBOTO_PATH, 31),
+    TextSection('company_name', ROBOTO_BOLD_PATH, 198, wrap=False),
+    TextSection('side_note', ROBOTO_PATH, 43, align='right', width_fraction=1 / 3, overlay=True),
+    TextSection('first_caption', ROBOTO_PATH, 31),
+    TextSection('second_caption', ROBOTO_PATH, 31),
+    TextSection('big_question', ROBOTO_BOLD_PATH, 57, separator=False, pin_bottom=True),
+])
+
+POSTER_FIELDS = {
+    # name: (max length, uppercase)
+    'tag_line': (52, True),
+    'after_tag': (55, False),
+    'main_content': (300, False),
+    'company_name': (5, True),
+    'side_note': (40, False),
+    'first_caption': (200, False),
+    'second_caption': (200, False),
+    'big_question': (51, True),
+}
+
+def parse_poster_fields(form) -> Dict[str, str]:
+    """Apply the poster character limits to submitted form data"""
+    fields = {}
+    for name, (max_length, upper) in POSTER_FIELDS.items():
+        value = form.get(name, '')
+        if upper:
+            value = value.upper()
+        fields[name] = value[:max_length]
+    return fields
+
+# Poster templates: named designs in POSTER_TEMPLATES_DIR/<name>.json, next
+# to the built-in 'classic' design defined above
+POSTER_TEMPLATES_DIR = os.getenv('POSTER_TEMPLATES_DIR', os.path.join(app.root_path, 'poster_templates'))
+DEFAULT_TEMPLATE = 'classic'
+TEMPLATE_SECTION_OPTIONS = ('align', 'width_fraction', 'wrap', 'separator', 'overlay', 'pin_bottom', 'wrap_mode')
+# Allowed values for section options that are otherwise silently misread
+TEMPLATE_SECTION_CHOICES = {'align': ('left', 'right', 'center'), 'wrap_mode': ('greedy', 'balanced')}
+TEMPLATE_LAYOUT_OPTIONS = ('padding', 'line_spacing', 'bottom_reserve', 'min_font_scale', 'font_scale_step',
+                           'text_color', 'separator_color')
+
+class PosterTemplate:
+    """A compiled poster design: layout, prerendered background and cache key.
+
+    key is mixed into render cache keys; it is empty for the built-in design
+    so its cached renders and ETags are unchanged.
+    """
+    def __init__(self, name: str, layout: 'PosterLayout', background: PosterBackground, key: str = ''):
+        self.name = name
+        self.layout = layout
+        self.background = background
+        self.key = key
+        self.backgrounds = {background.size: background}
+        self.layouts = {}
+        self._lock = threading.Lock()
+
+    def background_for(self, size) -> PosterBackground:
+        """Background for another canvas size, logo at the same bottom-right inset"""
+        background = self.backgrounds.get(size)
+        if background is None:
+            with self._lock:
+                background = self.backgrounds.get(size)
+                if background is None:
+                    base = self.background
+                    inset = (base.size[0] - base.logo_position[0], base.size[1] - base.logo_position[1])
+                    background = PosterBackground(size=size, color=base.color, logo_path=base.logo_path,
+                                                  logo_size=base.logo_size,
+                                                  logo_position=(size[0] - inset[0], size[1] - inset[1]))
+                    self.backgrounds[size] = background
+        return background
+
+    def layout_for(self, size) -> 'PosterLayout':
+        """The layout as drawn on a canvas of size.
+
+        Canvases at least as large as the template's get the same layout
+        centred; smaller ones get it laid out again so no text is cropped.
+        """
+        if size[0] >= self.layout.size[0] and size[1] >= self.layout.size[1]:
+            return self.layout
+        layout = self.layouts.get(size)
+        if layout is None:
+            with self._lock:
+                layout = self.layouts.get(size)
+                if layout is None:
+                    layout = self.layouts[size] = self.layout.resized(size)
+        return layout
+
+    def preload(self) -> None:
+        """Load every font size the layout can fall back to and render the background"""
+        for scale in self.layout.font_scales():
+            self.layout.load_fonts(scale)
+        self.background.get()
+
+    def info(self) -> Dict[str, Any]:
+        return {'name': self.name, 'width': self.layout.size[0], 'height': self.layout.size[1]}
+
+def compile_template(name: str, spec: Dict[str, Any], key: str = '') -> PosterTemplate:
+    """Build a PosterTemplate from a parsed template file.
+
+    Raises ValueError if the spec is malformed or references a missing font.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("template must be a JSON object")
     try:
-        # Get form data with character limits
-        tag_line = request.form.get('tag_line', '').upper()[:52]
-        after_tag = request.form.get('after_tag', '')[:55]
-        main_content = request.form.get('main_content', '')[:300]
-        company_name = request.form.get('company_name', '').upper()[:5]
-        side_note = request.form.get('side_note', '')[:40]
-        first_caption = request.form.get('first_caption', '')[:200]
-        second_caption = request.form.get('second_caption', '')[:200]
-        big_question = request.form.get('big_question', '').upper()[:51]
-
-        # Create image
-        img = Image.new('RGB', (1080, 1080), '#A4A5A6')
-        draw = ImageDraw.Draw(img)
+        size = tuple(int(v) for v in spec.get('size', (1080, 1080)))
+        sections = []
+        for item in spec['sections']:
+            if not isinstance(item, dict):
+                raise ValueError("each section must be a JSON object")
+            if item['field'] not in POSTER_FIELDS:
+                raise ValueError(f"unknown field {item['field']!r}")
+            options = {option: item[option] for option in TEMPLATE_SECTION_OPTIONS if option in item}
+            for option, choices in TEMPLATE_SECTION_CHOICES.items():
+                if option in options and options[option] not in choices:
+                    raise ValueError(f"{item['field']}: {option} must be one of {', '.join(choices)}")
+            font_path = os.path.join(FONTS_DIR, os.path.basename(item['font']))
+            sections.append(TextSection(item['field'], font_path, int(item['size']), **options))
+        layout_options = {option: spec[option] for option in TEMPLATE_LAYOUT_OPTIONS if option in spec}
+        if 'section_spacings' in spec:
+            layout_options['section_spacings'] = tuple(int(v) for v in spec['section_spacings'])
+        layout = PosterLayout(sections, size=size, **layout_options)
+
+        logo = spec.get('logo', {})
+        if logo is None:
+            background = PosterBackground(size=size, color=spec.get('background', '#A4A5A6'), logo_path=None)
+        else:
+            logo_size = tuple(int(v) for v in logo.get('size', (90, 90)))
+            inset = int(logo.get('inset', 90))
+            background = PosterBackground(size=size, color=spec.get('background', '#A4A5A6'),
+                                          logo_path=DEFAULT_LOGO_PATH, logo_size=logo_size,
+                                          logo_position=(size[0] - inset, size[1] - inset))
+        template = PosterTemplate(name, layout, background, key)
+        template.preload()
+    except (KeyError, TypeError, AttributeError, OSError) as e:
+        raise ValueError(f"{type(e).__name__}: {e}") from e
+    return template
+
+class TemplateRegistry:
+    """Named poster designs, compiled once and hot-reloaded.
 
+    Each <name>.json file is compiled on first use and recompiled only when
+    its mtime or size changes. If an edited file fails to compile, the last
+    good version keeps serving.
+    """
+    NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+    def __init__(self, directory: str, builtin: PosterTemplate):
+        self.directory = directory
+        self.builtin = builtin
+        self.compiled = {}  # name -> (file stamp, PosterTemplate)
+        self.loads = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def names(self):
         try:
-            font_57 = ImageFont.truetype(ROBOTO_BOLD_PATH, 57)
-            font_37 = ImageFont.truetype(ROBOTO_PATH, 37)
-            font_31 = ImageFont.truetype(ROBOTO_PATH, 31)
-            font_198 = ImageFont.truetype(ROBOTO_BOLD_PATH, 198)
-            font_43 = ImageFont.truetype(ROBOTO_PATH, 43)
-        except Exception as e:
-            app.logger.error(f"Font loading error: {e}")
-            return "Font loading error", 500
-
-        # Layout constants
-        padding = 40
-        max_width = 1080 - (padding * 2)
-        line_spacing = 1.1
-        section_spacing = 15
-        logo_space = 90  # Space reserved for logo at bottom
-
-        # Pre-calculate text blocks and their heights
-        tag_lines = wrap_text(tag_line, font_57, max_width)
-        after_lines = wrap_text(after_tag, font_37, max_width)
-        main_lines = wrap_text(main_content, font_31, max_width)
-        first_caption_lines = wrap_text(first_caption, font_31, max_width)
-        second_caption_lines = wrap_text(second_caption, font_31, max_width)
-        big_question_lines = wrap_text(big_question, font_57, max_width)
-
-        # Calculate heights
-        tag_height = calculate_text_height(tag_lines, font_57.size, line_spacing)
-        after_height = calculate_text_height(after_lines, font_37.size, line_spacing)
-        main_height = calculate_text_height(main_lines, font_31.size, line_spacing)
-        company_height = int(font_198.size * line_spacing)
-        first_caption_height = calculate_text_height(first_caption_lines, font_31.size, line_spacing)
-        second_caption_height = calculate_text_height(second_caption_lines, font_31.size, line_spacing)
-        big_question_height = calculate_text_height(big_question_lines, font_57.size, line_spacing)
-
-        # Calculate total content height
-        total_height = (padding + tag_height + section_spacing + 
-                       after_height + section_spacing +
-                       main_height + section_spacing +
-                       company_height + section_spacing +
-                       first_caption_height + section_spacing +
-                       second_caption_height + section_spacing +
-                       big_question_height + logo_space)
-
-        # Adjust spacing if content exceeds image height
-        if total_height > 1080:
-            section_spacing = 9  # Reduce section spacing
-            # Recalculate total height
-            total_height = (padding + tag_height + section_spacing + 
-                          after_height + section_spacing +
-                          main_height + section_spacing +
-                          company_height + section_spacing +
-                          first_caption_height + section_spacing +
-                          second_caption_height + section_spacing +
-                          big_question_height + logo_space)
-
-        # Start drawing from top with calculated positions
-        current_y = padding
-
-        # Draw tag line (right-aligned)
-        for line in tag_lines:
-            line_width = font_57.getlength(line)
-            draw.text((1080 - padding - line_width, current_y), line, font=font_57, fill='black')
-            current_y += int(font_57.size * line_spacing)
-        current_y += section_spacing
-        draw_separator_line(draw, current_y - 5, 1080, padding)
-
-        # Draw after tag
-        for line in after_lines:
-            draw.text((padding, current_y), line, font=font_37, fill='black')
-            current_y += int(font_37.size * line_spacing)
-        current_y += section_spacing
-        draw_separator_line(draw, current_y - 5, 1080, padding)
-
-        # Draw main content
-        for line in main_lines:
-            draw.text((padding, current_y), line, font=font_31, fill='black')
-            current_y += int(font_31.size * line_spacing)
-        current_y += section_spacing
-        draw_separator_line(draw, current_y - 5, 1080, padding)
-
-        # Company name and side note section
-        draw.text((padding, current_y), company_name, font=font_198, fill='black')
-        
-        # Side note (right-aligned)
-        wrapped_side = wrap_text(side_note, font_43, max_width/3)
-        side_y = current_y
-        for line in wrapped_side:
-            line_width = font_43.getlength(line)
-            draw.text((1080 - padding - line_width, side_y), line, font=font_43, fill='black')
-            side_y += int(font_43.size * line_spacing)
-        
-        current_y += company_height + section_spacing
-        draw_separator_line(draw, current_y - 5, 1080, padding)
-
-        # Draw first caption
-        for line in first_caption_lines:
-            draw.text((padding, current_y), line, font=font_31, fill='black')
-            current_y += int(font_31.size * line_spacing)
-        current_y += section_spacing
-        draw_separator_line(draw, current_y - 5, 1080, padding)
-
-        # Draw second caption
-        for line in second_caption_lines:
-            draw.text((padding, current_y), line, font=font_31, fill='black')
-            current_y += int(font_31.size * line_spacing)
-        current_y += section_spacing
-        draw_separator_line(draw, current_y - 5, 1080, padding)
-
-        # Calculate remaining space for big question
-        remaining_space = 1080 - logo_space - current_y
-        
-        # If remaining space is too small, adjust current_y
-        if remaining_space < big_question_height:
-            current_y = 1080 - logo_space - big_question_height
+            files = sorted(f[:-len('.json')] for f in os.listdir(self.directory) if f.endswith('.json'))
+        except OSError:
+            files = []
+        return [self.builtin.name] + [n for n in files if n != self.builtin.name and self.NAME_PATTERN.match(n)]
+
+    def get(self, name: Optional[str] = None) -> PosterTemplate:
+        """Compiled template by name; raises ValueError for unknown or broken templates"""
+        if not name or name == self.builtin.name:
+            return self.builtin
+        if not self.NAME_PATTERN.match(name):
+            raise ValueError(f"Unknown poster template: {name}")
+        path = os.path.join(self.directory, f"{name}.json")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ValueError(f"Unknown poster template: {name}") from None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self.compiled.get(name)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        with self._lock:
+            entry = self.compiled.get(name)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                template = compile_template(name, json.loads(raw),
+                                            key=f"{name}:{hashlib.sha256(raw).hexdigest()[:16]}")
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                if entry is None:
+                    raise ValueError(f"Poster template {name} failed to load: {e}") from e
+                app.logger.error(f"Poster template {name} failed to reload, keeping previous version: {e}")
+                self.compiled[name] = (stamp, entry[1])
+                return entry[1]
+            self.compiled[name] = (stamp, template)
+            self.loads += 1
+            return template
+
+    def preload(self) -> None:
+        self.builtin.preload()
+        for name in self.names():
+            try:
+                self.get(name)
+            except ValueError as e:
+                app.logger.error(str(e))
+
+    def stats(self) -> Dict[str, int]:
+        return {'compiled': len(self.compiled), 'loads': self.loads, 'errors': self.errors}
+
+classic_template = PosterTemplate(DEFAULT_TEMPLATE, poster_layout, poster_background)
+poster_templates = TemplateRegistry(POSTER_TEMPLATES_DIR, classic_template)
+
+def render_poster(fields: Dict[str, str], layout: Optional['PosterLayout'] = None,
+                  template: Optional[PosterTemplate] = None) -> Image.Image:
+    """Draw the poster for already-limited field values"""
+    template = template or classic_template
+    layout = layout or template.layout
+    return layout.render(fields, template.background.get())
+
+# Output variants: canvases get the layout rasterized at the centre of the
+# canvas; thumbnails are downscaled from another variant's render.
+POSTER_VARIANTS = {
+    'square': {'size': (1080, 1080)},
+    'story': {'size': (1080, 1920)},
+    'preview': {'size': (540, 540), 'source': 'square'},
+    'thumbnail': {'size': (270, 270), 'source': 'square'},
+}
+
+def background_for(size) -> PosterBackground:
+    """Prerendered background for a canvas size, logo in the bottom-right corner"""
+    return classic_template.background_for(size)
+
+def preload_assets() -> None:
+    """Load fonts and prerender backgrounds so forked workers share them.
+
+    gunicorn calls this in the master before forking (see gunicorn.conf.py);
+    the font objects and background bitmaps are then shared copy-on-write.
+    Every poster template is compiled here too.
+    """
+    poster_templates.preload()
+    for spec in POSTER_VARIANTS.values():
+        if 'source' not in spec:
+            background_for(spec['size']).get()
+
+def render_poster_variants(fields: Dict[str, str], names, layout: Optional['PosterLayout'] = None,
+                           template: Optional[PosterTemplate] = None) -> Dict[str, Image.Image]:
+    """Lay text out once and produce every requested variant from that plan.
+
+    Canvases smaller than the layout (e.g. square from a story-sized
+    template) get their own layout pass instead of a cropped copy.
+    """
+    template = template or classic_template
+    layout = layout or template.layout
+
+    def canvas_layout(size) -> PosterLayout:
+        if layout is template.layout:
+            return template.layout_for(size)
+        fits = size[0] >= layout.size[0] and size[1] >= layout.size[1]
+        return layout if fits else layout.resized(size)
+
+    plans = {}
+    images = {}
+
+    def rasterize(name):
+        if name in images:
+            return images[name]
+        spec = POSTER_VARIANTS[name]
+        if 'source' in spec:
+            source = rasterize(spec['source'])
+            with metrics.timer('thumbnail'):
+                images[name] = source.resize(spec['size'], Image.Resampling.BILINEAR, reducing_gap=2.0)
+        else:
+            width, height = spec['size']
+            target = canvas_layout(spec['size'])
+            if id(target) not in plans:
+                with metrics.timer('text_layout'):
+                    plans[id(target)] = target.measure(fields)
+            offset = ((width - target.size[0]) // 2, (height - target.size[1]) // 2)
+            with metrics.timer('draw'):
+                img = template.background_for(spec['size']).new_canvas()
+                target.draw(ImageDraw.Draw(img), plans[id(target)], offset)
+            images[name] = img
+        return images[name]
+
+    return {name: rasterize(name) for name in names}
+
+# Output encodings: name -> mimetype
+IMAGE_ENCODINGS = {
+    'png': 'image/png',
+    'png8': 'image/png',  # palette-quantized PNG
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+ENCODING_DEFAULTS = {
+    'compress_level': int(os.getenv('PNG_COMPRESS_LEVEL', 6)),
+    'colors': 64,
+    'quality': 90,
+}
+# Valid range for each tunable
+ENCODING_LIMITS = {
+    'compress_level': (0, 9),
+    'colors': (2, 256),
+    'quality': (1, 100),
+}
+
+def encode_image(img: Image.Image, fmt: str = 'png', **options) -> bytes:
+    """Encode a rendered poster; options override ENCODING_DEFAULTS"""
+    opts = dict(ENCODING_DEFAULTS, **options)
+    img_io = BytesIO()
+    with metrics.timer(f'{fmt}_encode'):
+        if fmt == 'png':
+            img.save(img_io, 'PNG', compress_level=opts['compress_level'])
+        elif fmt == 'png8':
+            palette = img.quantize(colors=opts['colors'], method=Image.Quantize.FASTOCTREE)
+            palette.save(img_io, 'PNG', compress_level=opts['compress_level'])
+        elif fmt == 'webp':
+            img.save(img_io, 'WEBP', quality=opts['quality'], method=4)
+        elif fmt == 'jpeg':
+            img.save(img_io, 'JPEG', quality=opts['quality'])
+        else:
+            raise ValueError(f"Unsupported image format: {fmt}")
+    return img_io.getvalue()
+
+def parse_encoding(values, accept: str = '') -> Tuple[str, Dict[str, int]]:
+    """Pick the output encoding from the `format` value or the Accept header.
 
-        # Draw big question
-        for line in big_question_lines:
-            draw.text((padding, current_y), line, font=font_57, fill='black')
-            current_y += int(font_57.size * line_spacing)
+    Raises ValueError for unknown formats or out-of-range options.
+    """
+    fmt = (values.get('format') or '').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if not fmt:
+        accept_mimetypes = parse_accept_header(accept, MIMEAccept)
+        best = accept_mimetypes.best_match(['image/png', 'image/webp', 'image/jpeg'])
+        fmt = {'image/webp': 'webp', 'image/jpeg': 'jpeg'}.get(best, 'png')
+    if fmt not in IMAGE_ENCODINGS:
+        raise ValueError(f"Unsupported image format: {fmt}")
 
-        # Add logo
+    options = {}
+    for name, (low, high) in ENCODING_LIMITS.items():
+        value = values.get(name)
+        if value in (None, ''):
+            continue
+        value = int(value)
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low} and {high}")
+        options[name] = value
+    return fmt, options
+
+def encoding_variant(fmt: str, options: Dict[str, int]) -> str:
+    """Render cache variant for an encoding; empty for the default PNG"""
+    if fmt == 'png' and not options:
+        return ''
+    return fmt + ''.join(f";{k}={v}" for k, v in sorted(options.items()))
+
+def encode_poster(fields: Dict[str, str], fmt: str = 'png',
+                  options: Optional[Dict[str, int]] = None, template_name: str = '') -> bytes:
+    """Render and encode without touching the render cache"""
+    template = poster_templates.get(template_name)
+    return encode_image(render_poster(fields, template=template), fmt, **(options or {}))
+
+@app.route('/generate', methods=['POST'])
+def generate_image():
+    try:
+        fields = parse_poster_fields(request.form)
         try:
-            logo = Image.open(DEFAULT_LOGO_PATH)
-            logo = logo.resize((90, 90))
-            img.paste(logo, (1080 - 50 - 40, 1080 - 50 - 40), logo if 'A' in logo.getbands() else None)
-        except Exception as e:
-            app.logger.error(f"Error adding logo: {e}")
+            fmt, options = parse_encoding(request.values, request.headers.get('Accept', ''))
+            template = poster_templates.get(request.values.get('template'))
+        except ValueError as e:
+            return str(e), 400
 
-        # Save and return image
-        img_io = BytesIO()
-        img.save(img_io, 'PNG', quality=95)
-        img_io.seek(0)
-        
-        return send_file(img_io, mimetype='image/png')
+        key = render_cache.key_for(fields, encoding_variant(fmt, options), template.key)
+        if request.if_none_match.contains(key):
+            response = Response(status=304)
+            response.set_etag(key)
+            response.vary.add('Accept')
+            return response
+
+        data = render_cache.get(key)
+        if data is None:
+            try:
+                template.layout.load_fonts()
+            except Exception as e:
+                app.logger.error(f"Font loading error: {e}")
+                return "Font loading error", 500
+
+            data = encode_poster(fields, fmt, options, template.name)
+            render_cache.put(key, data)
+
+        response = Response(data, mimetype=IMAGE_ENCODINGS[fmt])
+        response.set_etag(key)
+        response.vary.add('Accept')
+        return response
 
     except Exception as e:
         app.logger.error(f"Error generating image: {e}")
         return "Error generating image", 500
 
-# Add to app.py - New endpoint for caption generation
-@app.route('/generate-social', methods=['POST'])
-def generate_social():
+@app.route('/poster-templates')
+def list_poster_templates():
+    """Available poster designs for the `template` form field"""
+    templates = []
+    for name in poster_templates.names():
+        try:
+            templates.append(poster_templates.get(name).info())
+        except ValueError as e:
+            app.logger.error(str(e))
+    return jsonify(templates)
+
+@app.route('/generate-variants', methods=['POST'])
+def generate_variants():
+    """Several sizes of one poster in a single response (ZIP, or JSON with base64)"""
     try:
-        data = request.get_json()
-        
-        prompt = f"""Based on this news content:
-        Headline: {data['tag_line']}
-        Content: {data['main_content']}
+        fields = parse_poster_fields(request.form)
+        try:
+            fmt, options = parse_encoding(request.values, request.headers.get('Accept', ''))
+            template = poster_templates.get(request.values.get('template'))
+        except ValueError as e:
+            return str(e), 400
+        names = [n.strip() for n in request.values.get('variants', 'square,story,thumbnail').split(',') if n.strip()]
+        unknown = [n for n in names if n not in POSTER_VARIANTS]
+        if unknown or not names:
+            return f"Unknown variants: {', '.join(unknown)}. Choose from {', '.join(POSTER_VARIANTS)}", 400
+        output = request.values.get('output', 'zip')
+
+        encoding = encoding_variant(fmt, options)
+        keys = {name: render_cache.key_for(fields, f"{name}:{encoding}", template.key) for name in names}
+        bundle_key = hashlib.sha256(f"{output}:{','.join(keys[n] for n in names)}".encode()).hexdigest()
+        if request.if_none_match.contains(bundle_key):
+            response = Response(status=304)
+            response.set_etag(bundle_key)
+            return response
+
+        encoded = {name: render_cache.get(key) for name, key in keys.items()}
+        missing = [name for name, data in encoded.items() if data is None]
+        if missing:
+            for name, img in render_poster_variants(fields, missing, template=template).items():
+                encoded[name] = encode_image(img, fmt, **options)
+                render_cache.put(keys[name], encoded[name])
+
+        extension = 'jpg' if fmt == 'jpeg' else ('png' if fmt == 'png8' else fmt)
+        if output == 'json':
+            response = jsonify({
+                name: {
+                    'width': POSTER_VARIANTS[name]['size'][0],
+                    'height': POSTER_VARIANTS[name]['size'][1],
+                    'data_url': f"data:{IMAGE_ENCODINGS[fmt]};base64,{base64.b64encode(encoded[name]).decode('ascii')}"
+                }
+                for name in names
+            })
+        else:
+            archive_io = BytesIO()
+            with zipfile.ZipFile(archive_io, 'w', compression=zipfile.ZIP_STORED) as archive:
+                for name in names:
+                    archive.writestr(f"poster_{name}.{extension}", encoded[name])
+            response = Response(archive_io.getvalue(), mimetype='application/zip')
+            response.headers['Content-Disposition'] = 'attachment; filename=poster_variants.zip'
+        response.set_etag(bundle_key)
+        response.vary.add('Accept')
+        return response
+
+    except Exception as e:
+        app.logger.error(f"Error generating variants: {e}")
+        return "Error generating variants", 500
+
+# Batch generation
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 200))
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', os.cpu_count() or 1))
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def _init_render_worker() -> None:
+    preload_assets()
+
+def new_render_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool whose children start from a clean forkserver, not a fork.
+
+    Workers already run job-runner, article-pool and news-fetch threads; a
+    plain fork copies whatever locks those threads hold at that moment
+    (metrics, font and text-width caches) into the child, still held.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        context.set_forkserver_preload(['app'])
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                               initializer=_init_render_worker)
+
+def _get_batch_pool() -> ProcessPoolExecutor:
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = new_render_pool(BATCH_WORKERS)
+        return _batch_pool
+
+def _discard_batch_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a broken shared pool so the next submit starts a fresh one"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is pool:
+            _batch_pool = None
+
+def _discard_if_broken(pool: ProcessPoolExecutor, future: Future) -> None:
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_batch_pool(pool)
+
+def submit_to_batch_pool(fn, *args) -> Future:
+    """Submit to the shared process pool, replacing it if a child process died.
+
+    A pool breaks for good once any child is killed; the pool is dropped
+    both when submit() fails and when a future fails with BrokenProcessPool,
+    so later calls get a new pool instead of the dead one.
+    """
+    for attempt in range(2):
+        pool = _get_batch_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            _discard_batch_pool(pool)
+            if attempt:
+                raise
+            continue
+        future.add_done_callback(lambda f, pool=pool: _discard_if_broken(pool, f))
+        return future
+
+def pool_encode_poster(fields: Dict[str, str], fmt: str = 'png',
+                       options: Optional[Dict[str, int]] = None, template_name: str = '') -> bytes:
+    """Process pool entry point: encode_poster(), then snapshot this child's metrics.
+
+    The flush is forced because pool children exit without flushing, so a
+    throttled flush would lose their last observations.
+    """
+    try:
+        return encode_poster(fields, fmt, options, template_name)
+    finally:
+        metrics.flush(force=True)
+
+def generate_posters(field_sets, max_workers: Optional[int] = None):
+    """Render many posters on a process pool.
+
+    Yields (index, png, error) tuples in completion order. The render cache
+    is consulted and filled here in the parent; only misses go to the pool.
+    At most two items per worker are in flight, so finished images are never
+    all held at once. If the pool breaks, the affected items are reported as
+    errors and the rest go to a replacement pool.
+    """
+    own_pool = new_render_pool(max_workers) if max_workers is not None else None
+    window = (max_workers or BATCH_WORKERS) * 2
+    items = iter(enumerate(field_sets))
+    pending = {}  # future -> (index, cache key)
+    try:
+        while True:
+            for index, form in items:
+                try:
+                    if not isinstance(form, dict):
+                        raise ValueError("Item must be an object of poster fields")
+                    fields = parse_poster_fields({k: str(v) for k, v in form.items()})
+                    template = poster_templates.get(str(form.get('template') or ''))
+                    key = render_cache.key_for(fields, '', template.key)
+                    png = render_cache.get(key)
+                    if png is not None:
+                        yield index, png, None
+                        continue
+                    args = (pool_encode_poster, fields, 'png', {}, '' if template is classic_template else template.name)
+                    future = own_pool.submit(*args) if own_pool else submit_to_batch_pool(*args)
+                except Exception as e:
+                    yield index, None, str(e)
+                    continue
+                pending[future] = (index, key)
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = pending.pop(future)
+                try:
+                    png = future.result()
+                except Exception as e:
+                    # Includes BrokenProcessPool when a child died; the pool is replaced
+                    yield index, None, str(e) or type(e).__name__
+                    continue
+                render_cache.put(key, png)
+                yield index, png, None
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_pool is not None:
+            own_pool.shutdown(wait=False)
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink that zipfile can stream into"""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _stream_batch_zip(results):
+    buffer = _StreamBuffer()
+    manifest = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for index, png, error in results:
+            if png is not None:
+                name = f"poster_{index:04d}.png"
+                archive.writestr(name, png)
+                manifest.append({'index': index, 'file': name})
+            else:
+                manifest.append({'index': index, 'error': error})
+            yield buffer.drain()
+        archive.writestr('manifest.json', json.dumps(sorted(manifest, key=lambda m: m['index']), indent=2))
+    yield buffer.drain()
+
+def _stream_batch_multipart(results, boundary: str):
+    for index, png, error in results:
+        if png is not None:
+            headers = (f"Content-Type: image/png\r\n"
+                       f"Content-Disposition: attachment; filename=\"poster_{index:04d}.png\"\r\n")
+            body = png
+        else:
+            headers = "Content-Type: application/json\r\n"
+            body = json.dumps({'index': index, 'error': error}).encode('utf-8')
+        yield (f"--{boundary}\r\nX-Item-Index: {index}\r\n{headers}\r\n").encode('utf-8')
+        yield body + b"\r\n"
+    yield f"--{boundary}--\r\n".encode('utf-8')
+
+@app.route('/generate-batch', methods=['POST'])
+def generate_batch():
+    """Render a list of poster field sets, streaming each result as it finishes"""
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty list of poster field sets"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} items"}), 400
+
+    output = (data.get('format') if isinstance(data, dict) else None) or request.args.get('format', 'zip')
+    results = generate_posters(items)
+    if output == 'multipart':
+        boundary = uuid.uuid4().hex
+        return Response(_stream_batch_multipart(results, boundary),
+                        mimetype=f'multipart/mixed; boundary={boundary}')
+
+    response = Response(_stream_batch_zip(results), mimetype='application/zip')
+    response.headers['Content-Disposition'] = 'attachment; filename=posters.zip'
+    return response
+
+# Social caption generation
+SOCIAL_PROMPT = """Based on this news content:
+        Headline: {tag_line}
+        Content: {main_content}
         
         Generate:
         1. An engaging social media caption (max 200 characters)
         2. A set of relevant hashtags (max 15 hashtags)
         Format as JSON with "caption" and "hashtags" keys."""
-        
-        response = model.generate_content(prompt)
-        content = response.text
-        start = content.find('{')
-        end = content.rfind('}') + 1
-        if start >= 0 and end > start:
-            return jsonify(json.loads(content[start:end]))
-        
-        raise ValueError("Invalid response format")
+
+BULK_SOCIAL_PROMPT = """For each numbered news item below, generate:
+        1. An engaging social media caption (max 200 characters)
+        2. A set of relevant hashtags (max 15 hashtags)
+        Format as JSON: {{"results": [{{"id": <item number>, "caption": "...", "hashtags": [...]}}]}}
+        with exactly one entry per item.
+
+{items}"""
+
+BULK_SOCIAL_CONCURRENCY = int(os.getenv('BULK_SOCIAL_CONCURRENCY', 4))
+BULK_SOCIAL_MAX_TOKENS = int(os.getenv('BULK_SOCIAL_MAX_TOKENS', 3000))
+BULK_SOCIAL_MAX_ITEMS = int(os.getenv('BULK_SOCIAL_MAX_ITEMS', 10))
+BULK_SOCIAL_MAX_REQUEST = int(os.getenv('BULK_SOCIAL_MAX_REQUEST', 500))
+# Seconds a bulk request may keep starting model calls; with the calls still in
+# flight it must finish inside the gunicorn worker timeout (30s by default)
+BULK_SOCIAL_TIME_BUDGET = float(os.getenv('BULK_SOCIAL_TIME_BUDGET', 15))
+BULK_SOCIAL_DEFERRED = 'Not started within the request time budget; resubmit it'
+# Rough budget for the caption and hashtags the model writes back per item
+CAPTION_OUTPUT_TOKENS = 100
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+def extract_json_object(content: str) -> Any:
+    """Parse the outermost {...} block out of a model response"""
+    start = content.find('{')
+    end = content.rfind('}') + 1
+    if start >= 0 and end > start:
+        return json.loads(content[start:end])
+    raise ValueError("Invalid response format")
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire after ttl seconds"""
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        super().__init__(max_entries)
+        self.ttl = ttl
+
+    def get(self, key):
+        entry = super().get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self.entries.pop(key, None)
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return value
+
+    def put(self, key, value) -> None:
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+    def peek(self, key):
+        """Unexpired value without updating recency or counters"""
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution"""
+    def __init__(self):
+        self.calls = {}
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+            else:
+                self.coalesced += 1
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self.calls.pop(key, None)
+            call['done'].set()
+
+class CaptionService:
+    """Cached, coalesced social caption generation.
+
+    The model client only needs a generate_content(prompt) method returning an
+    object with .text, so tests can pass a local fake. Without one, it is built
+    by model_factory on the first upstream call.
+    """
+    def __init__(self, model_client=None, ttl: float = 3600, max_entries: int = 1024,
+                 model_factory=None):
+        self.model = model_client
+        self.model_factory = model_factory
+        self.cache = TTLCache(max_entries, ttl)
+        self.flights = SingleFlight()
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_seconds = 0.0
+        self.upstream_max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: Any) -> str:
+        return ' '.join(str(text or '').split())
+
+    def key_for(self, tag_line: str, main_content: str) -> str:
+        payload = json.dumps([self.normalize(tag_line).upper(), self.normalize(main_content)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def client(self):
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    self.model = self.model_factory()
+        return self.model
+
+    def call_model(self, prompt: str) -> str:
+        started = time.perf_counter()
+        try:
+            with metrics.timer('gemini'):
+                return self.client().generate_content(prompt).text
+        except Exception:
+            with self._lock:
+                self.upstream_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.upstream_calls += 1
+                self.upstream_seconds += elapsed
+                self.upstream_max_seconds = max(self.upstream_max_seconds, elapsed)
+
+    def _generate_uncached(self, key: str, tag_line: str, main_content: str) -> Dict[str, Any]:
+        # Another flight may have filled the cache while this one waited to lead
+        cached = self.cache.peek(key)
+        if cached is not None:
+            return cached
+        prompt = SOCIAL_PROMPT.format(tag_line=tag_line, main_content=main_content)
+        result = extract_json_object(self.call_model(prompt))
+        self.cache.put(key, result)
+        return result
+
+    def generate(self, tag_line: str, main_content: str) -> Dict[str, Any]:
+        key = self.key_for(tag_line, main_content)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self.flights.do(key, lambda: self._generate_uncached(key, tag_line, main_content))
+
+    def plan_batches(self, items, max_batch_tokens: int, max_batch_items: int):
+        """Group (index, tag_line, main_content) items under the token and size limits"""
+        batch, batch_tokens = [], estimate_tokens(BULK_SOCIAL_PROMPT)
+        for item in items:
+            tokens = estimate_tokens(item[1] + item[2]) + CAPTION_OUTPUT_TOKENS
+            if batch and (batch_tokens + tokens > max_batch_tokens or len(batch) >= max_batch_items):
+                yield batch
+                batch, batch_tokens = [], estimate_tokens(BULK_SOCIAL_PROMPT)
+            batch.append(item)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def _generate_batch(self, batch) -> list:
+        """One model call for several items; returns (index, result, error) tuples"""
+        if len(batch) == 1:
+            index, tag_line, main_content = batch[0]
+            try:
+                return [(index, self.generate(tag_line, main_content), None)]
+            except Exception as e:
+                return [(index, None, str(e))]
+
+        listing = '\n\n'.join(
+            f"Item {n}:\nHeadline: {tag_line}\nContent: {main_content}"
+            for n, (_, tag_line, main_content) in enumerate(batch)
+        )
+        by_id = {}
+        try:
+            parsed = extract_json_object(self.call_model(BULK_SOCIAL_PROMPT.format(items=listing)))
+            for entry in parsed.get('results', []):
+                if isinstance(entry, dict) and 'caption' in entry:
+                    by_id[int(entry.get('id'))] = {
+                        'caption': entry['caption'],
+                        'hashtags': entry.get('hashtags', [])
+                    }
+        except Exception as e:
+            app.logger.warning(f"Bulk caption batch failed, retrying items singly: {e}")
+
+        results = []
+        for n, (index, tag_line, main_content) in enumerate(batch):
+            result = by_id.get(n)
+            if result is not None:
+                self.cache.put(self.key_for(tag_line, main_content), result)
+                results.append((index, result, None))
+                continue
+            # Missing or malformed entry: fall back to a dedicated call
+            try:
+                results.append((index, self.generate(tag_line, main_content), None))
+            except Exception as e:
+                results.append((index, None, str(e)))
+        return results
+
+    def generate_many(self, items, concurrency: int = BULK_SOCIAL_CONCURRENCY,
+                      max_batch_tokens: int = BULK_SOCIAL_MAX_TOKENS,
+                      max_batch_items: int = BULK_SOCIAL_MAX_ITEMS,
+                      deadline: Optional[float] = None):
+        """Caption many {tag_line, main_content} items with packed prompts.
+
+        Yields (index, result, error) as soon as each item is known: cache hits
+        first, then every batch as its model call finishes. Batches not started
+        by the deadline (a time.monotonic() value) are yielded with the
+        BULK_SOCIAL_DEFERRED error instead.
+        """
+        pending_items = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or 'tag_line' not in item or 'main_content' not in item:
+                yield index, None, "Item needs tag_line and main_content"
+                continue
+            tag_line, main_content = str(item['tag_line']), str(item['main_content'])
+            cached = self.cache.get(self.key_for(tag_line, main_content))
+            if cached is not None:
+                yield index, cached, None
+            else:
+                pending_items.append((index, tag_line, main_content))
+
+        batches = self.plan_batches(pending_items, max_batch_tokens, max_batch_items)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='bulk-caption') as pool:
+            running = set()
+            for batch in batches:
+                if deadline is not None and time.monotonic() >= deadline:
+                    for index, _, _ in batch:
+                        yield index, None, BULK_SOCIAL_DEFERRED
+                    continue
+                running.add(pool.submit(self._generate_batch, batch))
+                if len(running) >= concurrency:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            for future in running:
+                yield from future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            'cache': self.cache.stats(),
+            'hit_rate': round(self.cache.hits / lookups, 4) if lookups else 0.0,
+            'coalesced': self.flights.coalesced,
+            'upstream_calls': self.upstream_calls,
+            'upstream_errors': self.upstream_errors,
+            'upstream_avg_seconds': round(self.upstream_seconds / self.upstream_calls, 4) if self.upstream_calls else 0.0,
+            'upstream_max_seconds': round(self.upstream_max_seconds, 4)
+        }
+
+caption_service = CaptionService(
+    model_factory=create_gemini_model,
+    ttl=float(os.getenv('SOCIAL_CACHE_TTL', 3600)),
+    max_entries=int(os.getenv('SOCIAL_CACHE_SIZE', 1024))
+)
+
+@app.route('/generate-social', methods=['POST'])
+def generate_social():
+    try:
+        data = request.get_json()
+        return jsonify(caption_service.generate(data['tag_line'], data['main_content']))
         
     except Exception as e:
         app.logger.error(f"Error generating social content: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def _bounded_int(value, default: int, maximum: int) -> int:
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+@app.route('/generate-social-bulk', methods=['POST'])
+def generate_social_bulk():
+    """Caption many items, streaming one NDJSON line per item as batches finish.
+
+    Work is bounded by BULK_SOCIAL_TIME_BUDGET so a sync worker is not killed
+    mid-stream; the last line lists the indexes left for a follow-up request.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty list of {tag_line, main_content} items"}), 400
+    if len(items) > BULK_SOCIAL_MAX_REQUEST:
+        return jsonify({"error": f"Request exceeds {BULK_SOCIAL_MAX_REQUEST} items"}), 400
+
+    options = data if isinstance(data, dict) else {}
+    results = caption_service.generate_many(
+        items,
+        concurrency=_bounded_int(options.get('concurrency'), BULK_SOCIAL_CONCURRENCY, BULK_SOCIAL_CONCURRENCY),
+        max_batch_tokens=_bounded_int(options.get('max_batch_tokens'), BULK_SOCIAL_MAX_TOKENS, BULK_SOCIAL_MAX_TOKENS),
+        max_batch_items=_bounded_int(options.get('max_batch_items'), BULK_SOCIAL_MAX_ITEMS, BULK_SOCIAL_MAX_ITEMS),
+        deadline=time.monotonic() + BULK_SOCIAL_TIME_BUDGET
+    )
+
+    def stream():
+        pending = []
+        for index, result, error in results:
+            if error == BULK_SOCIAL_DEFERRED:
+                pending.append(index)
+                continue
+            line = {'index': index, 'error': error} if error else dict(result, index=index)
+            yield json.dumps(line) + '\n'
+        if pending:
+            yield json.dumps({'pending': sorted(pending)}) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+# Background jobs: fetch news -> render poster -> caption, run off the request path
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+# Seconds before the first retry; doubles on each further attempt
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', 5))
+JOB_MAX_SUBMIT = int(os.getenv('JOB_MAX_SUBMIT', 100))
+# A running job whose heartbeat is older than this is assumed lost and requeued
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 300))
+JOB_RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_SECONDS', 24 * 3600))
+# Keep streams shorter than the gunicorn worker timeout; clients reconnect with the pending ids
+JOB_STREAM_TIMEOUT = float(os.getenv('JOB_STREAM_TIMEOUT', 25))
+
+class JobStore(SQLiteStore):
+    """Durable job queue shared by every worker through a SQLite (WAL) file.
+
+    Jobs move queued -> running -> done | failed. Claiming is a short
+    BEGIN IMMEDIATE transaction, so each job goes to exactly one runner
+    across processes; running jobs that stop sending heartbeats are claimed
+    again. The article chosen for a job is checkpointed so a retry reuses it
+    instead of consuming another one.
+    """
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, params TEXT NOT NULL, '
+        'attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL, '
+        'heartbeat REAL, run_after REAL, article_id TEXT, fields TEXT, result TEXT, error TEXT, image BLOB, '
+        'mimetype TEXT)',
+        'CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS jobs_article ON jobs (article_id)',
+    )
+
+    def submit(self, params_list) -> list:
+        conn = self._connect()
+        now = time.time()
+        ids = [uuid.uuid4().hex for _ in params_list]
+        conn.execute('BEGIN')
+        try:
+            conn.executemany("INSERT INTO jobs (id, status, params, created_at) VALUES (?, 'queued', ?, ?)",
+                             [(job_id, json.dumps(params), now) for job_id, params in zip(ids, params_list)])
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                         (now - JOB_RETENTION_SECONDS,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return ids
+
+    def claim(self, stale_after: float = JOB_STALE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Mark the oldest runnable job as running and return it, or None"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # A stale job whose worker died on its last allowed attempt is not retried
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Worker stopped responding' "
+                "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                (now, now - stale_after, JOB_MAX_ATTEMPTS))
+            row = conn.execute(
+                "SELECT id, params, attempts, fields, article_id FROM jobs "
+                "WHERE (status = 'queued' AND (run_after IS NULL OR run_after <= ?)) "
+                "OR (status = 'running' AND heartbeat < ? AND attempts < ?) "
+                "ORDER BY created_at LIMIT 1", (now, now - stale_after, JOB_MAX_ATTEMPTS)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                             "heartbeat = ? WHERE id = ?", (now, now, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'params': json.loads(row[1]),
+            'attempts': row[2] + 1,
+            'fields': json.loads(row[3]) if row[3] else None,
+            'article_id': row[4]
+        }
+
+    def heartbeat(self, job_id: str) -> None:
+        self._connect().execute('UPDATE jobs SET heartbeat = ? WHERE id = ?', (time.time(), job_id))
+
+    def checkpoint(self, job_id: str, article_id: Optional[str], fields: Dict[str, str]) -> None:
+        self._connect().execute('UPDATE jobs SET article_id = ?, fields = ?, heartbeat = ? WHERE id = ?',
+                                (article_id, json.dumps(fields), time.time(), job_id))
+
+    def finish(self, job_id: str, result: Dict[str, Any], image: bytes, mimetype: str) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, image = ?, mimetype = ?, error = NULL "
+            "WHERE id = ?", (time.time(), json.dumps(result), image, mimetype, job_id))
+
+    def fail(self, job_id: str, error: str, retry_after: Optional[float] = None) -> None:
+        """Requeue the job after retry_after seconds, or mark it failed if None"""
+        if retry_after is not None:
+            self._connect().execute("UPDATE jobs SET status = 'queued', error = ?, run_after = ? WHERE id = ?",
+                                    (error, time.time() + retry_after, job_id))
+        else:
+            self._connect().execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                                    (time.time(), error, job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([job_id]).get(job_id)
+
+    def get_many(self, job_ids) -> Dict[str, Dict[str, Any]]:
+        """Public view of jobs (without image bytes), keyed by id"""
+        ids = list(job_ids)[:JOB_MAX_SUBMIT]
+        if not ids:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT id, status, attempts, created_at, started_at, finished_at, article_id, result, error "
+            f"FROM jobs WHERE id IN ({','.join('?' * len(ids))})", ids)
+        jobs = {}
+        for job_id, status, attempts, created, started, finished, article_id, result, error in rows:
+            job = {
+                'id': job_id,
+                'status': status,
+                'attempts': attempts,
+                'created_at': created,
+                'started_at': started,
+                'finished_at': finished,
+                'article_id': article_id,
+                'error': error
+            }
+            if result:
+                job['result'] = dict(json.loads(result), image_url=f"/jobs/{job_id}/image")
+            jobs[job_id] = job
+        return jobs
+
+    def image(self, job_id: str) -> Optional[Tuple[bytes, str]]:
+        row = self._connect().execute(
+            "SELECT image, mimetype FROM jobs WHERE id = ? AND status = 'done'", (job_id,)).fetchone()
+        return (bytes(row[0]), row[1]) if row and row[0] is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')
+        return dict(rows.fetchall())
+
+job_store = JobStore(os.getenv('JOB_DB_PATH', os.path.join(DATA_DIR, 'jobs.sqlite3')))
+
+def run_job_pipeline(job: Dict[str, Any], store: JobStore) -> Tuple[Dict[str, Any], bytes, str]:
+    """fetch news -> render poster -> caption for one claimed job.
+
+    Articles come from next_article(), so the news_cache dedup store keeps
+    concurrent and repeated jobs on distinct stories; renders and captions go
+    through render_cache and caption_service, so identical content is reused.
+    """
+    params = job['params']
+    fields = job['fields']
+    article_id = job['article_id']
+    if fields is None:
+        if params.get('fields'):
+            raw = params['fields']
+        else:
+            article = next_article(params.get('category'), fallback=False)
+            if article is None:
+                raise RuntimeError("No unseen articles available")
+            article_id = article['article_id']
+            raw = article_poster_fields(article)
+        fields = parse_poster_fields({k: str(v) for k, v in raw.items()})
+        store.checkpoint(job['id'], article_id, fields)
+
+    fmt = params.get('format', 'png')
+    template = params.get('template', '')
+    options = params.get('options', {})
+    key = render_cache.key_for(fields, encoding_variant(fmt, options), poster_templates.get(template).key)
+    image = render_cache.get(key)
+    if image is None:
+        image = submit_to_batch_pool(pool_encode_poster, fields, fmt, options, template).result()
+        render_cache.put(key, image)
+    store.heartbeat(job['id'])
+
+    result = {'fields': fields, 'format': fmt, 'template': template or DEFAULT_TEMPLATE, 'social': None}
+    if params.get('caption', True):
+        try:
+            result['social'] = caption_service.generate(fields['tag_line'], fields['main_content'])
+        except Exception as e:
+            result['social_error'] = str(e)
+    return result, image, IMAGE_ENCODINGS[fmt]
+
+class JobRunner:
+    """Threads that claim jobs from the JobStore and run the pipeline.
+
+    Started lazily in each process (threads do not survive fork), so every
+    gunicorn worker contributes `workers` runners to the shared queue. New
+    submissions wake this process's runners; otherwise they poll.
+    """
+    def __init__(self, store: JobStore, workers: int = 2, poll_interval: float = 2.0):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self) -> None:
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [threading.Thread(target=self._run, name=f'job-runner-{i}', daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self) -> None:
+        self.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        # Any store error (e.g. "database is locked") is logged and the loop
+        # carries on; a job left running is reclaimed once its heartbeat is stale
+        while True:
+            try:
+                job = self.store.claim()
+                if job is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self.process(job)
+                metrics.flush()
+            except Exception as e:
+                app.logger.warning(f"Job runner error: {e}")
+                time.sleep(self.poll_interval)
+
+    def process(self, job: Dict[str, Any]) -> None:
+        try:
+            with metrics.timer('job'):
+                result, image, mimetype = run_job_pipeline(job, self.store)
+        except Exception as e:
+            self._fail(job, e)
+            return
+        for attempt in range(3):
+            try:
+                self.store.finish(job['id'], result, image, mimetype)
+                break
+            except sqlite3.OperationalError as e:
+                app.logger.warning(f"Job {job['id']} finish failed: {e}")
+                if attempt == 2:
+                    self._fail(job, e)
+                    return
+                time.sleep(0.5 * (attempt + 1))
+        self.completed += 1
+
+    def _fail(self, job: Dict[str, Any], error: Exception) -> None:
+        retry = job['attempts'] < JOB_MAX_ATTEMPTS
+        app.logger.warning(f"Job {job['id']} attempt {job['attempts']} failed: {error}")
+        self.store.fail(job['id'], str(error), JOB_RETRY_DELAY * 2 ** (job['attempts'] - 1) if retry else None)
+        if retry:
+            self.retried += 1
+        else:
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': len(self._threads) if self._pid == os.getpid() else 0,
+            'completed': self.completed,
+            'failed': self.failed,
+            'retried': self.retried
+        }
+
+job_runner = JobRunner(job_store, workers=JOB_WORKERS)
+
+@app.route('/jobs', methods=['POST'])
+def submit_jobs():
+    """Queue `count` pipeline runs; returns their ids immediately (202)"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    try:
+        fmt, options = parse_encoding({k: str(v) for k, v in data.items() if v is not None})
+        template = poster_templates.get(data.get('template'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    fields = data.get('fields')
+    if fields is not None and not isinstance(fields, dict):
+        return jsonify({"error": "fields must be an object of poster fields"}), 400
+    count = _bounded_int(data.get('count', 1), 1, JOB_MAX_SUBMIT)
+
+    params = {
+        'category': data.get('category'),
+        'template': '' if template is classic_template else template.name,
+        'format': fmt,
+        'options': options,
+        'caption': bool(data.get('caption', True)),
+        'fields': fields
+    }
+    ids = job_store.submit([params] * count)
+    job_runner.wake()
+    return jsonify({'ids': ids, 'status_urls': [f"/jobs/{job_id}" for job_id in ids]}), 202
+
+@app.route('/jobs', methods=['GET'])
+def job_queue_stats():
+    job_runner.start()
+    return jsonify({'jobs': job_store.counts(), 'runner': job_runner.stats()})
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job_runner.start()
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/image')
+def get_job_image(job_id):
+    found = job_store.image(job_id)
+    if found is None:
+        return jsonify({"error": "No image for this job (unknown or not finished)"}), 404
+    data, mimetype = found
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(hashlib.sha256(data).hexdigest())
+    return response.make_conditional(request)
+
+@app.route('/jobs/stream')
+def stream_jobs():
+    """NDJSON: one line per job as it finishes, then the ids still pending at timeout"""
+    ids = [i for i in request.args.get('ids', '').split(',') if i][:JOB_MAX_SUBMIT]
+    if not ids:
+        return jsonify({"error": "Pass job ids as ?ids=a,b,c"}), 400
+    try:
+        timeout = float(request.args.get('timeout', JOB_STREAM_TIMEOUT))
+    except ValueError:
+        timeout = None
+    if timeout is None or not timeout >= 0:  # also rejects nan
+        return jsonify({"error": "timeout must be a non-negative number of seconds"}), 400
+    timeout = min(timeout, JOB_STREAM_TIMEOUT)
+    job_runner.start()
+
+    def stream():
+        pending = set(ids)
+        deadline = time.monotonic() + timeout
+        while pending:
+            jobs = job_store.get_many(pending)
+            for job_id in [i for i in pending if i not in jobs]:
+                pending.discard(job_id)
+                yield json.dumps({'id': job_id, 'error': 'Unknown job'}) + '\n'
+            for job in jobs.values():
+                if job['status'] in ('done', 'failed'):
+                    pending.discard(job['id'])
+                    yield json.dumps(job) + '\n'
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(0.5)
+        if pending:
+            yield json.dumps({'pending': sorted(pending)}) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
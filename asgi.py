@@ -0,0 +1,129 @@
+"""Async (ASGI) serving mode.
+
+Run with:  gunicorn -w 4 -k uvicorn.workers.UvicornWorker asgi:app
+
+The network-bound routes (/fetch-news, /generate-social) and /generate are
+served by coroutines: blocking upstream calls wait on a thread pool and poster
+rendering runs on the process pool, so a slow upstream no longer pins a whole
+worker. Every other route is passed through to the Flask app unchanged.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+from app import (IMAGE_ENCODINGS, app as flask_app, caption_service, encoding_variant,
+                 fetch_news_payload, metrics, parse_encoding, parse_poster_fields, pool_encode_poster,
+                 poster_templates, render_cache, request_stage_timings, server_timing_header,
+                 submit_to_batch_pool)
+
+ASYNC_IO_THREADS = int(os.getenv('ASYNC_IO_THREADS', 64))
+
+_io_executor = ThreadPoolExecutor(max_workers=ASYNC_IO_THREADS, thread_name_prefix='async-io')
+
+
+async def run_io(fn, *args):
+    """Run a blocking network call without blocking the event loop.
+
+    The call runs in a copy of the current context so its stage timers reach
+    this request's Server-Timing header.
+    """
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, call)
+
+
+async def fetch_news(request):
+    return JSONResponse(await run_io(fetch_news_payload, request.query_params.get('category')))
+
+
+async def generate_social(request):
+    try:
+        data = await request.json()
+        return JSONResponse(await run_io(caption_service.generate, data['tag_line'], data['main_content']))
+    except Exception as e:
+        flask_app.logger.error(f"Error generating social content: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def generate_image(request):
+    try:
+        form = await request.form()
+        values = dict(request.query_params)
+        values.update(form)
+        fields = parse_poster_fields(form)
+        try:
+            fmt, options = parse_encoding(values, request.headers.get('accept', ''))
+            template = poster_templates.get(values.get('template'))
+        except ValueError as e:
+            return PlainTextResponse(str(e), status_code=400)
+
+        key = render_cache.key_for(fields, encoding_variant(fmt, options), template.key)
+        headers = {'ETag': f'"{key}"', 'Vary': 'Accept'}
+        if parse_etags(request.headers.get('if-none-match')).contains(key):
+            return Response(status_code=304, headers=headers)
+
+        data = render_cache.get(key)
+        if data is None:
+            # CPU-bound: render on the process pool so the loop keeps serving
+            with metrics.timer('pool_render'):
+                data = await asyncio.wrap_future(submit_to_batch_pool(pool_encode_poster, fields, fmt, options,
+                                                                      template.name))
+            render_cache.put(key, data)
+
+        return Response(data, media_type=IMAGE_ENCODINGS[fmt], headers=headers)
+
+    except Exception as e:
+        flask_app.logger.error(f"Error generating image: {e}")
+        return PlainTextResponse("Error generating image", status_code=500)
+
+
+class RequestMetricsMiddleware:
+    """Request latency and Server-Timing for the native async routes.
+
+    Requests passed through to Flask already carry a Server-Timing header
+    from its after_request hook and are left alone. This worker's metrics
+    are snapshotted after every request handled here.
+    """
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.inner(scope, receive, send)
+            return
+        started = time.perf_counter()
+        timings = []
+        token = request_stage_timings.set(timings)
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                if not any(name.lower() == b'server-timing' for name, _ in headers):
+                    elapsed = time.perf_counter() - started
+                    metrics.observe('poster_request_seconds', f'route="{scope["path"]}"', elapsed)
+                    headers.append((b'server-timing', server_timing_header(timings, elapsed).encode('latin-1')))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.inner(scope, receive, send_with_timing)
+        finally:
+            request_stage_timings.reset(token)
+            metrics.flush()
+
+
+app = Starlette(routes=[
+    Route('/fetch-news', fetch_news, methods=['GET']),
+    Route('/generate-social', generate_social, methods=['POST']),
+    Route('/generate', generate_image, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
+app.add_middleware(RequestMetricsMiddleware)
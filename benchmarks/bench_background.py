@@ -0,0 +1,56 @@
+"""Compare building the poster base per request against copying the prerendered layer.
+
+Usage: python benchmarks/bench_background.py [iterations]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+import app
+
+
+def per_request_base():
+    img = Image.new('RGB', (1080, 1080), '#A4A5A6')
+    logo = Image.open(app.DEFAULT_LOGO_PATH)
+    logo = logo.resize((90, 90))
+    img.paste(logo, (1080 - 50 - 40, 1080 - 50 - 40), logo if 'A' in logo.getbands() else None)
+    return img
+
+
+def prerendered_base():
+    return app.poster_background.new_canvas()
+
+
+def measure(fn, iterations):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    results = {
+        'per-request': measure(per_request_base, iterations),
+        'prerendered': measure(prerendered_base, iterations),
+    }
+    for name, (elapsed, peak) in results.items():
+        print(f"{name:<12} {elapsed * 1000:8.3f} ms/request  {peak / 1024:8.1f} KiB peak python alloc")
+    saved = results['per-request'][0] - results['prerendered'][0]
+    print(f"saved        {saved * 1000:8.3f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
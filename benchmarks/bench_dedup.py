@@ -0,0 +1,50 @@
+"""Measure DedupStore add/contains throughput at scale.
+
+Usage: python benchmarks/bench_dedup.py [ids]   (default 1,000,000)
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch = 10_000
+    probes = 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = app.DedupStore(os.path.join(tmp, 'dedup.sqlite3'))
+
+        start = time.perf_counter()
+        for offset in range(0, total, batch):
+            store.add_many(f"article-{i}" for i in range(offset, min(offset + batch, total)))
+        elapsed = time.perf_counter() - start
+        print(f"add_many  {total:>9} ids  {total / elapsed:12.0f} ids/s")
+
+        singles = 2_000
+        start = time.perf_counter()
+        for i in range(singles):
+            store.add(f"single-{i}")
+        elapsed = time.perf_counter() - start
+        print(f"add       {singles:>9} ids  {singles / elapsed:12.0f} ids/s")
+
+        keys = [f"article-{random.randrange(total)}" for _ in range(probes // 2)]
+        keys += [f"missing-{i}" for i in range(probes // 2)]
+        random.shuffle(keys)
+        start = time.perf_counter()
+        found = sum(store.contains(key) for key in keys)
+        elapsed = time.perf_counter() - start
+        print(f"contains  {probes:>9} ids  {probes / elapsed:12.0f} ids/s  ({found} hits)")
+
+        size = os.path.getsize(store.path)
+        print(f"database  {len(store):>9} rows {size / 1024 / 1024:10.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Report encode latency and output size for each poster encoding.
+
+Usage: python benchmarks/bench_encoding.py [iterations]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+FIELDS = app.parse_poster_fields({
+    'tag_line': 'Innovation and Technology Shape Our Digital Future',
+    'after_tag': 'New developments reshape our future',
+    'main_content': ('As we progress through 2025, technological innovations are revolutionizing '
+                     'how we live and work. From advanced AI systems to sustainable solutions, these '
+                     'breakthroughs are addressing global challenges.'),
+    'company_name': 'TECH',
+    'side_note': 'Breaking News',
+    'first_caption': 'Breakthrough developments in artificial intelligence continue to transform industries.',
+    'second_caption': 'Experts predict more breakthrough developments ahead.',
+    'big_question': "WHAT'S NEXT FOR TECHNOLOGY?",
+})
+
+VARIANTS = [
+    ('png', {'compress_level': 0}),
+    ('png', {'compress_level': 1}),
+    ('png', {'compress_level': 6}),
+    ('png', {'compress_level': 9}),
+    ('png8', {'colors': 16}),
+    ('png8', {'colors': 64}),
+    ('webp', {'quality': 80}),
+    ('webp', {'quality': 90}),
+    ('jpeg', {'quality': 80}),
+    ('jpeg', {'quality': 90}),
+]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    img = app.render_poster(FIELDS)
+    print(f"{'encoding':<28} {'median ms':>10} {'p95 ms':>8} {'bytes':>9}")
+    for fmt, options in VARIANTS:
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            data = app.encode_image(img, fmt, **options)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        label = app.encoding_variant(fmt, options)
+        print(f"{label:<28} {statistics.median(timings):10.2f} {p95:8.2f} {len(data):9d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Check that ingest_articles() keeps the same articles as the old validators.
+
+The per-article path mirrors the old pipeline: every field is str()/strip()ped
+for each check and the dedup store is queried once per valid article. The
+batch path is ingest_articles() plus ArticleIndex lookups. Both paths cost
+about the same; ingest_articles() exists to merge the two validators into
+one, not to be faster. Timings are printed so a regression stands out.
+
+Usage: python benchmarks/bench_ingest.py [articles]   (default 10,000)
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def make_articles(total):
+    now = datetime.now(timezone.utc)
+    articles = []
+    for i in range(total):
+        articles.append({
+            'article_id': f'article-{i}',
+            'title': f'Headline number {i} about something notable'[:random.choice((25, 45, 52, 60))],
+            'description': 'Description words. ' * random.choice((4, 7, 9, 12)),
+            'content': 'Content sentence for the poster body. ' * random.choice((4, 8, 12, 15)),
+            'source_id': 'bench',
+            'category': ['technology'],
+            'pubDate': (now - timedelta(days=random.uniform(0, 10))).strftime('%Y-%m-%d %H:%M:%S'),
+        })
+    return articles
+
+
+def per_article(articles, store):
+    kept = []
+    for article in articles:
+        try:
+            title = str(article.get('title', '')).strip()
+            description = str(article.get('description', '')).strip()
+            content = str(article.get('content', '')).strip()
+            valid = (30 <= len(title) <= 52 and 100 <= len(description) <= 200 and
+                     200 <= len(content) <= 500 and title.isprintable() and
+                     description.isprintable() and content.isprintable())
+        except Exception:
+            valid = False
+        if (valid and not store.contains(article.get('article_id', '')) and
+                app.is_recent_article(article)):
+            kept.append(article)
+    return kept
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    articles = make_articles(total)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = app.DedupStore(os.path.join(tmp, 'dedup.sqlite3'))
+        store.add_many(f'article-{i}' for i in range(0, total, 10))
+        app.news_cache = store
+
+        start = time.perf_counter()
+        kept = per_article(articles, store)
+        elapsed = time.perf_counter() - start
+        print(f"per-article  {total:>7} articles  {elapsed * 1000:9.1f} ms  ({len(kept)} kept)")
+
+        start = time.perf_counter()
+        index = app.ArticleIndex(['technology'])
+        index.add('technology', app.ingest_articles(articles))
+        elapsed = time.perf_counter() - start
+        print(f"batch ingest {total:>7} articles  {elapsed * 1000:9.1f} ms  ({len(index)} kept)")
+
+        start = time.perf_counter()
+        taken = 0
+        while index.take('technology') is not None:
+            taken += 1
+        elapsed = time.perf_counter() - start
+        print(f"index take   {taken:>7} articles  {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Measure worker startup: import time, preload time and first request after fork.
+
+Each run starts a fresh interpreter that imports app, optionally calls
+preload_assets() (what gunicorn.conf.py does in the master), then forks a
+child the way gunicorn forks a worker and times the child's first /health
+and /generate. It also reports whether the Gemini SDK and requests were
+imported, since both should now load lazily.
+
+Usage: python benchmarks/bench_startup.py [runs]   (default 5)
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIELDS = {
+    'tag_line': 'Innovation and Technology Shape Our Digital Future',
+    'after_tag': 'New developments reshape our future',
+    'main_content': 'Technological breakthroughs continue to emerge, transforming industries.',
+    'company_name': 'TECH',
+    'side_note': 'Breaking News',
+    'first_caption': 'Innovation continues to accelerate across sectors.',
+    'second_caption': 'Experts predict more breakthrough developments ahead.',
+    'big_question': "WHAT'S NEXT FOR TECHNOLOGY?",
+}
+
+
+def child(preload):
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import app
+    result = {'import_ms': (time.perf_counter() - start) * 1000}
+
+    start = time.perf_counter()
+    if preload:
+        app.preload_assets()
+    result['preload_ms'] = (time.perf_counter() - start) * 1000
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        worker = {}
+        client = app.app.test_client()
+        start = time.perf_counter()
+        client.get('/health')
+        worker['first_health_ms'] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        response = client.post('/generate', data=FIELDS)
+        worker['first_generate_ms'] = (time.perf_counter() - start) * 1000
+        worker['status'] = response.status_code
+        os.write(write_fd, json.dumps(worker).encode('utf-8'))
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result.update(json.loads(f.read()))
+    os.waitpid(pid, 0)
+    result['genai_loaded'] = 'google.generativeai' in sys.modules
+    result['requests_loaded'] = 'requests' in sys.modules
+    print(json.dumps(result))
+
+
+def run(preload, runs):
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            env = dict(os.environ, DATA_DIR=data_dir)
+            env.pop('RENDER_CACHE_DIR', None)
+            out = subprocess.run([sys.executable, __file__, '--child', 'preload' if preload else 'cold'],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2] == 'preload')
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'mode':<8} {'import ms':>10} {'preload ms':>11} {'1st health':>11} {'1st generate':>13}  lazy")
+    for mode, preload in (('cold', False), ('preload', True)):
+        samples = run(preload, runs)
+        median = {key: statistics.median(s[key] for s in samples)
+                  for key in ('import_ms', 'preload_ms', 'first_health_ms', 'first_generate_ms')}
+        lazy = not any(s['genai_loaded'] or s['requests_loaded'] for s in samples)
+        print(f"{mode:<8} {median['import_ms']:10.1f} {median['preload_ms']:11.1f} "
+              f"{median['first_health_ms']:11.1f} {median['first_generate_ms']:13.1f}  {'yes' if lazy else 'no'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Benchmark and profiling suite for the poster pipeline.
+
+Drives wrap_text (greedy and balanced), smart_truncate, the full /generate
+render path and PNG encoding over realistic inputs (typical, max-length,
+overflow and unicode fields). For every benchmark it reports latency percentiles, peak Python
+allocations (tracemalloc) and optionally a cProfile breakdown, writes the
+results as JSON and compares them against a stored baseline.
+
+Usage:
+    python benchmarks/bench_suite.py                       # run and print
+    python benchmarks/bench_suite.py --save-baseline       # store benchmarks/baseline.json
+    python benchmarks/bench_suite.py --output results.json --profile
+    python benchmarks/bench_suite.py --threshold 0.10      # exit 1 if p50 regresses >10%
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+CASES = {
+    'typical': {
+        'tag_line': 'Innovation and Technology Shape Our Digital Future',
+        'after_tag': 'New developments reshape our future',
+        'main_content': ('As we progress through 2025, technological innovations are revolutionizing '
+                         'how we live and work. From advanced AI systems to sustainable solutions, '
+                         'these breakthroughs are addressing global challenges.'),
+        'company_name': 'TECH',
+        'side_note': 'Breaking News',
+        'first_caption': 'Breakthrough developments in artificial intelligence continue to transform industries.',
+        'second_caption': 'Experts predict more breakthrough developments ahead.',
+        'big_question': "WHAT'S NEXT FOR TECHNOLOGY?",
+    },
+    'max_length': {
+        'tag_line': 'Global Markets Rally As Central Banks Signal Rate Cut',
+        'after_tag': 'Investors welcome the clearest guidance in two years.',
+        'main_content': ('Stocks climbed across Asia, Europe and the Americas after policymakers hinted '
+                         'that borrowing costs could fall before the end of the year. Analysts said the '
+                         'shift reflects cooling inflation and slower hiring, while warning that energy '
+                         'prices and supply chain risks could still complicate the outlook for growth.'),
+        'company_name': 'WORLD',
+        'side_note': 'Markets and Economy Weekly Briefing',
+        'first_caption': ('Central banks on three continents signalled a turn toward lower rates, sending '
+                          'equities higher and bond yields lower as traders priced in a softer landing.'),
+        'second_caption': ('Economists caution that the path remains uncertain, with energy costs, wage '
+                           'growth and geopolitical tension all capable of reviving inflation pressure.'),
+        'big_question': 'WILL LOWER RATES BE ENOUGH TO KEEP GROWTH GOING?',
+    },
+    'overflow': {
+        'tag_line': 'W' * 52,
+        'after_tag': 'word ' * 11,
+        'main_content': 'lorem ipsum dolor sit amet ' * 12,
+        'company_name': 'ABCDE',
+        'side_note': 'several short words ' * 2,
+        'first_caption': 'caption words repeated ' * 9,
+        'second_caption': 'caption words repeated ' * 9,
+        'big_question': 'QUESTION MARK ' * 4,
+    },
+    'unicode': {
+        'tag_line': 'Café Naïve Résumé — “Quotes” Über Alles',
+        'after_tag': 'Ünïcödé coverage: São Paulo, Kraków, Zürich',
+        'main_content': 'Smörgåsbord façade coöperate déjà vu — naïveté, piñata, jalapeño. ' * 4,
+        'company_name': 'ÉCHO',
+        'side_note': 'Événements',
+        'first_caption': 'Ångström-level précision in señor García’s laboratory. ' * 3,
+        'second_caption': 'Œuvre, æsthetic, ﬁnancial ligatures and ½ fractions. ' * 3,
+        'big_question': '¿QUÉ SIGUE PARA EL MUNDO?',
+    },
+}
+
+
+def fresh_render(fields):
+    """Full render path with the layout and render caches bypassed"""
+    app.poster_layout.plans.entries.clear()
+    return app.encode_image(app.render_poster(fields), 'png')
+
+
+def build_benchmarks():
+    fonts = app.poster_layout.load_fonts()
+    body_font = fonts['main_content']
+    max_width = app.poster_layout.max_width
+    benches = {}
+    for case, raw in CASES.items():
+        fields = app.parse_poster_fields(raw)
+        long_text = ' '.join(raw.values())
+        image = app.render_poster(fields)
+        benches[f'wrap_text/{case}'] = lambda t=long_text: app.wrap_text(t, body_font, max_width)
+        benches[f'wrap_balanced/{case}'] = (
+            lambda t=long_text: app.wrap_text_with_widths(t, body_font, max_width, 'balanced'))
+        benches[f'smart_truncate/{case}'] = lambda t=long_text: [app.smart_truncate(t, n) for n in (52, 55, 200, 500)]
+        benches[f'layout_measure/{case}'] = (
+            lambda f=fields: (app.poster_layout.plans.entries.clear(), app.poster_layout.measure(f)))
+        benches[f'generate_image/{case}'] = lambda f=fields: fresh_render(f)
+        benches[f'png_encode/{case}'] = lambda img=image: app.encode_image(img, 'png')
+    return benches
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_benchmark(fn, iterations, warmup=3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    tracemalloc.start()
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50), 4),
+        'p90_ms': round(percentile(timings, 0.90), 4),
+        'p99_ms': round(percentile(timings, 0.99), 4),
+        'mean_ms': round(sum(timings) / len(timings), 4),
+        'peak_alloc_kib': round(peak / 1024, 2),
+        'retained_alloc_kib': round(current / 1024, 2),
+    }
+
+
+def profile_benchmark(fn, iterations, limit=12):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(iterations):
+        fn()
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or not previous.get('p50_ms'):
+            continue
+        change = (current['p50_ms'] - previous['p50_ms']) / previous['p50_ms']
+        current['baseline_p50_ms'] = previous['p50_ms']
+        current['change'] = round(change, 4)
+        if change > threshold:
+            regressions.append((name, previous['p50_ms'], current['p50_ms'], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed p50 slowdown before failing')
+    parser.add_argument('--profile', action='store_true', help='print a cProfile breakdown per benchmark')
+    args = parser.parse_args()
+
+    results = {}
+    profiles = {}
+    for name, fn in build_benchmarks().items():
+        if args.filter not in name:
+            continue
+        results[name] = run_benchmark(fn, args.iterations)
+        if args.profile:
+            profiles[name] = profile_benchmark(fn, max(1, args.iterations // 3))
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+
+    print(f"{'benchmark':<32} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'peak KiB':>9} {'vs base':>8}")
+    for name, r in results.items():
+        change = f"{r['change'] * 100:+.1f}%" if 'change' in r else '-'
+        print(f"{name:<32} {r['p50_ms']:9.3f} {r['p90_ms']:9.3f} {r['p99_ms']:9.3f} "
+              f"{r['peak_alloc_kib']:9.1f} {change:>8}")
+    for name, text in profiles.items():
+        print(f"\n=== cProfile: {name} ===\n{text}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'template_version': app.TEMPLATE_VERSION,
+        'benchmarks': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold * 100:.0f}%:")
+        for name, before, after, change in regressions:
+            print(f"  {name}: {before:.3f} ms -> {after:.3f} ms ({change * 100:+.1f}%)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Compare one sync worker against one async (ASGI) worker on slow upstreams.
+
+Both servers run in-process against stubbed upstreams: a local newsdata.io
+stand-in and a fake Gemini client, each adding fixed latency. Every request
+uses distinct inputs so the response caches do not hide the upstream wait.
+
+Usage: python benchmarks/loadtest_async.py [concurrency] [upstream_latency_s]
+"""
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+UPSTREAM_LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+NEWS_PORT, SYNC_PORT, ASYNC_PORT = 18101, 18102, 18103
+
+os.environ.update({
+    'NEWSDATA_API_URL': f'http://127.0.0.1:{NEWS_PORT}/api/1/news',
+    'NEWSDATA_API_KEY': 'loadtest',
+    'NEWS_POOL_LOW_WATER': '0',
+    'NEWS_POOL_TARGET': '0',
+    'NEWS_PAGE_TTL': '0',
+    'DATA_DIR': tempfile.mkdtemp(prefix='poster-loadtest-'),
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import uvicorn
+from werkzeug.serving import make_server
+
+import app
+import asgi
+
+
+class StubNewsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(UPSTREAM_LATENCY)
+        article_id = uuid.uuid4().hex
+        body = json.dumps({'results': [{
+            'article_id': article_id,
+            'title': f'Stub headline for load testing {article_id[:12]}',
+            'description': 'A stub description long enough to pass validation. ' * 3,
+            'content': 'Stub content that is long enough to pass the validation rules. ' * 5,
+            'source_id': 'stub',
+            'category': ['technology'],
+        }]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SlowFakeModel:
+    def generate_content(self, prompt):
+        time.sleep(UPSTREAM_LATENCY)
+
+        class Reply:
+            text = '{"caption": "stub caption", "hashtags": ["#stub"]}'
+        return Reply()
+
+
+def serve_in_thread(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_until_up(port):
+    for _ in range(100):
+        try:
+            requests.get(f'http://127.0.0.1:{port}/health', timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def one_request(port, route):
+    start = time.perf_counter()
+    if route == '/generate-social':
+        response = requests.post(f'http://127.0.0.1:{port}{route}', timeout=120,
+                                 json={'tag_line': uuid.uuid4().hex, 'main_content': 'load test'})
+    else:
+        response = requests.get(f'http://127.0.0.1:{port}{route}', timeout=120)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def run(port, route):
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        start = time.perf_counter()
+        latencies = list(pool.map(lambda _: one_request(port, route), range(CONCURRENCY)))
+        wall = time.perf_counter() - start
+    latencies.sort()
+    return wall, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app.app.logger.setLevel(logging.WARNING)
+    app.caption_service.model = SlowFakeModel()
+
+    news_server = ThreadingHTTPServer(('127.0.0.1', NEWS_PORT), StubNewsHandler)
+    serve_in_thread(news_server.serve_forever)
+
+    # A single sync worker, like one `gunicorn -w 1` process
+    sync_server = make_server('127.0.0.1', SYNC_PORT, app.app, threaded=False)
+    serve_in_thread(sync_server.serve_forever)
+
+    async_server = uvicorn.Server(uvicorn.Config(asgi.app, host='127.0.0.1', port=ASYNC_PORT,
+                                                 log_level='warning'))
+    serve_in_thread(async_server.run)
+
+    wait_until_up(SYNC_PORT)
+    wait_until_up(ASYNC_PORT)
+
+    print(f"{CONCURRENCY} concurrent requests, {UPSTREAM_LATENCY:.2f}s upstream latency, one worker each")
+    print(f"{'route':<18} {'mode':<6} {'wall s':>8} {'p50 s':>8} {'p95 s':>8} {'req/s':>8}")
+    for route in ('/generate-social', '/fetch-news'):
+        for mode, port in (('sync', SYNC_PORT), ('async', ASYNC_PORT)):
+            wall, p50, p95 = run(port, route)
+            print(f"{route:<18} {mode:<6} {wall:8.2f} {p50:8.2f} {p95:8.2f} {CONCURRENCY / wall:8.1f}")
+
+    async_server.should_exit = True
+    sync_server.shutdown()
+    news_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""gunicorn settings: import the app once in the master and fork workers from it.
+
+With preload_app the fonts, logo and prerendered backgrounds are loaded a
+single time and shared copy-on-write, so new or restarted workers serve
+their first /generate without touching the disk. Heavy clients (Gemini,
+requests) stay lazy and are created inside each worker on first use.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    import app
+    app.preload_assets()
+    server.log.info("Preloaded fonts and poster backgrounds")
+
+
+def post_fork(server, worker):
+    # Job runner threads do not survive fork; start them in each worker
+    import app
+    app.job_runner.start()
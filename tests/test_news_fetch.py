@@ -0,0 +1,119 @@
+"""newsdata.io fetching against a local http.server stub.
+
+The stub serves NEWSDATA_API_URL and picks its behaviour from the requested
+category, so each test uses its own categories (and page-cache keys).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='poster-tests-'))
+
+import app  # noqa: E402
+
+
+def make_articles(category, count=3):
+    published = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return [{
+        'article_id': f'{category}-{i}',
+        'title': f'Headline {i} about {category} developments'[:52],
+        'description': 'Description words for the poster captions. ' * 3,
+        'content': 'Content sentence for the poster body text. ' * 6,
+        'source_id': 'stub',
+        'category': [category],
+        'pubDate': published,
+    } for i in range(count)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # category -> list of (status, headers, delay) served before the 200 page
+    scripts = {}
+    # category -> seconds to sleep before answering
+    delays = {}
+    requests = []
+
+    def do_GET(self):
+        category = parse_qs(urlparse(self.path).query).get('category', [''])[0]
+        StubHandler.requests.append((category, time.monotonic()))
+        time.sleep(StubHandler.delays.get(category, 0))
+        script = StubHandler.scripts.get(category)
+        if script:
+            status, headers = script.pop(0)
+            body = b'{}'
+        else:
+            status, headers = 200, {}
+            body = json.dumps({'status': 'success', 'results': make_articles(category)}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def newsdata(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(app, 'NEWSDATA_API_URL', f'http://127.0.0.1:{server.server_port}/api/1/news')
+    StubHandler.scripts, StubHandler.delays, StubHandler.requests = {}, {}, []
+    yield StubHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_rate_limited_page_is_retried_after_retry_after(newsdata):
+    newsdata.scripts['ratelimited'] = [(429, {'Retry-After': '1'})]
+
+    start = time.monotonic()
+    data = app.fetch_news_page('key', 'ratelimited', deadline=start + 5)
+
+    assert [a['article_id'] for a in data['results']] == ['ratelimited-0', 'ratelimited-1', 'ratelimited-2']
+    times = [t for category, t in newsdata.requests if category == 'ratelimited']
+    assert len(times) == 2
+    assert times[1] - times[0] >= 1.0
+
+
+def test_retry_after_past_deadline_gives_up_without_waiting(newsdata):
+    newsdata.scripts['throttled'] = [(429, {'Retry-After': '60'})] * 2
+
+    start = time.monotonic()
+    assert app.fetch_news_page('key', 'throttled', deadline=start + 2) is None
+    assert app.fetch_category_articles('key', 'throttled', deadline=start + 2) == []
+
+    assert time.monotonic() - start < 1.0
+    assert len(newsdata.requests) == 2
+
+
+def test_categories_missing_the_deadline_are_skipped(newsdata):
+    newsdata.delays['slow'] = 3
+
+    start = time.monotonic()
+    results = app.fetch_articles_by_category('key', ['fast', 'slow'], deadline=start + 1)
+
+    assert time.monotonic() - start < 2.0
+    assert list(results) == ['fast']
+    assert [record.article_id for record in results['fast']] == ['fast-0', 'fast-1', 'fast-2']
+
+
+def test_empty_pool_fetches_only_the_requested_category(newsdata, monkeypatch):
+    monkeypatch.setenv('NEWSDATA_API_KEY', 'key')
+    monkeypatch.setattr(app, 'article_pool', app.ArticlePool(low_water=0, target=0, refresh_interval=600))
+
+    article = app.next_article('science', fallback=False)
+
+    assert article['article_id'].startswith('science-')
+    assert {category for category, _ in newsdata.requests} == {'science'}